@@ -0,0 +1,153 @@
+import importlib.util
+import logging
+from typing import Dict, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI
+from app.core.config import settings
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response body wrapper that releases the in-flight slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    Pooled transport that counts requests holding a connection. A request counts as
+    in flight until its response body is closed, which is when httpx hands the
+    connection back to the pool.
+    """
+
+    def __init__(self, max_connections: int, **kwargs):
+        super().__init__(**kwargs)
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.saturated = 0 # Requests that found every pooled connection busy
+        self.errors = 0
+
+    def _release(self):
+        self.in_flight -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.in_flight >= self.max_connections:
+            self.saturated += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.errors += 1
+            self._release()
+            raise
+        response.stream = _TrackedStream(response.stream, self._release)
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak,
+            "max_connections": self.max_connections,
+            "requests": self.requests,
+            "saturated": self.saturated,
+            "errors": self.errors
+        }
+
+
+class ClientRegistry:
+    """
+    Application-scoped upstream clients, shared by every service so connection pools,
+    TLS sessions and keep-alives are reused. Opened in the FastAPI lifespan (lazily on
+    first use otherwise, e.g. in scripts) and closed on shutdown.
+
+      - http: generic pooled httpx client (callbacks/webhooks)
+      - llm:  AsyncOpenAI client for LLM_BASE_URL on its own pooled transport;
+              llm_for() gives clients for other endpoints sharing that same pool
+    """
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+        self._llm_http: Optional[httpx.AsyncClient] = None
+        self._llm_clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+        self._transports = {}
+
+    def _http2(self) -> bool:
+        if settings.HTTP2 and importlib.util.find_spec("h2") is None:
+            logging.warning("HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+            return False
+        return settings.HTTP2
+
+    def _build_client(self, name: str, timeout: httpx.Timeout) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        transport = InstrumentedTransport(settings.HTTP_MAX_CONNECTIONS, limits=limits, http2=self._http2())
+        self._transports[name] = transport
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = self._build_client("http", httpx.Timeout(10.0, connect=settings.LLM_CONNECT_TIMEOUT))
+        return self._http
+
+    @property
+    def llm(self) -> AsyncOpenAI:
+        return self.llm_for(settings.LLM_BASE_URL, settings.LLM_API_KEY)
+
+    def llm_for(self, base_url: str, api_key: str) -> AsyncOpenAI:
+        """OpenAI-compatible client for one endpoint; all of them share the "llm" connection pool."""
+        client = self._llm_clients.get((base_url, api_key))
+        if client is None:
+            if self._llm_http is None:
+                # Default read timeout is the loosest stage budget; each call passes its own
+                timeout = httpx.Timeout(
+                    max(settings.CHAT_TIMEOUT_MS, settings.SCAM_TIMEOUT_MS, settings.INTEL_TIMEOUT_MS) / 1000.0,
+                    connect=settings.LLM_CONNECT_TIMEOUT
+                )
+                self._llm_http = self._build_client("llm", timeout)
+            client = self._llm_clients[(base_url, api_key)] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=self._llm_http,
+                max_retries=settings.LLM_MAX_RETRIES
+            )
+        return client
+
+    def start(self):
+        # Build both up front so the first request doesn't pay for it
+        self.http
+        self.llm
+
+    async def aclose(self):
+        # The OpenAI clients only wrap the shared pool; closing it closes them all
+        self._llm_clients = {}
+        if self._llm_http is not None:
+            await self._llm_http.aclose()
+            self._llm_http = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._transports = {}
+
+    def stats(self) -> dict:
+        return {name: transport.stats() for name, transport in self._transports.items()}
+
+clients = ClientRegistry()
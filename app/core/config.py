@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
@@ -12,12 +12,133 @@ class Settings(BaseSettings):
     LLM_API_KEY: str = "insert-your-key-here"
     LLM_BASE_URL: str = "https://api.groq.com/openai/v1" 
     LLM_MODEL: str = "mixtral-8x7b-32768"
-    
+    # Per-task routing, JSON: {"chat"|"scam"|"intel"|<service>: [{"model", "base_url"?, "api_key"?}, ...]}
+    # Tasks without an entry use LLM_MODEL at LLM_BASE_URL. See app/services/llm_router.py.
+    LLM_ROUTES: Dict[str, List[Dict[str, str]]] = {}
+    LLM_ROUTE_ORDER_PENALTY: float = 0.5 # Each later list position must be this much faster to win
+    LLM_ROUTE_EWMA_ALPHA: float = 0.2
+    LLM_ROUTE_ERROR_HALF_LIFE: float = 30.0 # Seconds for an idle endpoint's error rate to halve
+
+    # Upstream HTTP Pool (one shared LLM client + one shared HTTP client per process)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0 # Seconds an idle connection stays open
+    HTTP2: bool = False # Needs the 'h2' package
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_MAX_RETRIES: int = 2
+
+    # Upstream Protection (per model, shared by all services)
+    # Circuit breaker opens when failed/slow calls reach the ratio within the window; sheds for COOLDOWN seconds
+    LLM_GUARD_ENABLED: bool = True
+    LLM_BREAKER_FAILURE_RATIO: float = 0.5
+    LLM_BREAKER_MIN_CALLS: int = 10
+    LLM_BREAKER_WINDOW: float = 30.0
+    LLM_BREAKER_COOLDOWN: float = 15.0
+    LLM_SLOW_CALL_MS: float = 5000.0 # Calls slower than this count as failures
+    # AIMD concurrency limit: calls beyond it are shed immediately instead of queuing
+    LLM_CONCURRENCY_INITIAL: int = 20
+    LLM_CONCURRENCY_MIN: int = 2
+    LLM_CONCURRENCY_MAX: int = 200
+
+    # Latency Budget
+    # Respond as soon as the reply is ready; the scam result is used if it lands within
+    # RESPONSE_BUDGET_MS, otherwise a cached/heuristic score. Session update finishes in the background.
+    EARLY_RESPONSE: bool = True
+    RESPONSE_BUDGET_MS: float = 2500.0
+    CHAT_TIMEOUT_MS: float = 8000.0
+    SCAM_TIMEOUT_MS: float = 10000.0
+    INTEL_TIMEOUT_MS: float = 15000.0
+    CHAT_HEDGE_AFTER_MS: float = 0.0 # >0: fire a duplicate chat call if the first is slower than this
+
+    # Retried /message requests (same session, text and history length, plus Idempotency-Key
+    # if sent) share one computation; completed responses are replayed to late retries
+    MESSAGE_DEDUP_ENABLED: bool = True
+    MESSAGE_DEDUP_TTL: float = 30.0 # Seconds
+    MESSAGE_DEDUP_MAX_ENTRIES: int = 10000
+
+    # Chat Prompt
+    CHAT_PROMPT_TOKEN_BUDGET: int = 1200 # Estimated prompt tokens for persona + summary + recent turns
+    CHAT_RECENT_TURNS: int = 8 # History entries kept verbatim; older ones are folded into a summary (verbatim until then)
+    CHAT_SUMMARY_BATCH: int = 4 # Re-summarize once this many entries have left the verbatim window
+
     # Scam Detection
     SCAM_SCORE_THRESHOLD: float = 0.7
+    # Local pre-filter tiers: >= HIGH is a scam, <= LOW (and allowlisted small talk) is benign, otherwise ask the LLM
+    SCAM_PREFILTER_ENABLED: bool = True
+    SCAM_PREFILTER_HIGH: float = 0.85
+    SCAM_PREFILTER_LOW: float = 0.05
+    # Micro-batching: classify messages from concurrent requests in one LLM call
+    SCAM_BATCHING: bool = False
+    SCAM_BATCH_SIZE: int = 16
+    SCAM_BATCH_WAIT_MS: float = 5.0
+    # Nearest-neighbour index of known scam/benign messages (hashed n-grams, needs numpy)
+    # "off" | "gate": answer locally when close references agree, else ask the LLM | "direct": never ask the LLM
+    SCAM_INDEX_MODE: str = "off"
+    SCAM_INDEX_PATH: Optional[str] = None # Prefix for saved .vectors.npy/.labels.npy (memory-mapped); seed set if unset
+    SCAM_INDEX_DIM: int = 4096
+    SCAM_INDEX_K: int = 5
+    SCAM_INDEX_MIN_SIMILARITY: float = 0.5 # Nearest reference must be at least this close to be trusted
+    SCAM_INDEX_AGREEMENT: float = 0.8 # gate: share of the (weighted) neighbour vote needed to skip the LLM
+    SCAM_INDEX_LEARN: bool = False # Add messages the LLM scored >= SCAM_INDEX_LEARN_SCORE as scam references
+    SCAM_INDEX_LEARN_SCORE: float = 0.9
+    SCAM_INDEX_LEARN_MAX_SIMILARITY: float = 0.9 # Don't learn messages this close to an existing reference
+    SCAM_INDEX_MAX_SIZE: int = 20000 # References kept at most (4096 dims: ~16KB each); learning stops when full
+    SCAM_INDEX_OFFLOAD_ABOVE: int = 2000 # Larger indexes are searched in a worker thread, off the event loop
+
+    # Session-level scam score: decayed log-odds sum of per-turn scores (see app/services/session_scorer.py)
+    SCAM_SESSION_DECAY: float = 0.8 # Weight earlier turns keep each time a scam-like turn is scored
+    SCAM_SESSION_BENIGN_WEIGHT: float = 0.1 # Share of a harmless-looking turn's log-odds that counts (no decay)
+    SCAM_SESSION_DECIDED: float = 0.95 # Session score at which per-turn scam scoring stops
+    SCAM_SESSION_MIN_TURNS: int = 2 # Scored turns needed before a session can be decided
+    SCAM_SESSION_RECHECK_EVERY: int = 5 # Decided sessions still score every Nth message (0: never)
+
+    # Fused Analysis: one LLM call for scam scoring + intelligence extraction (instead of two)
+    FUSED_ANALYSIS: bool = False
     
+    # Session Storage
+    # "memory": process-local dict (default, single worker)
+    # "sqlite": shared SQLite WAL database, required for `uvicorn --workers N`
+    SESSION_BACKEND: str = "memory"
+    SESSION_DB_PATH: str = "sessions.db"
+
+    # Session Persistence (memory backend)
+    # "journal": write-behind append log + periodic compaction into sessions.json
+    # "snapshot": rewrite sessions.json on every update (legacy)
+    SESSION_PERSISTENCE: str = "journal"
+    SESSION_JOURNAL_PATH: str = "sessions.journal"
+    SESSION_COMPACT_EVERY: int = 1000 # Journal records before compaction
+    SESSION_COMPACT_INTERVAL: float = 60.0 # Max seconds between compactions
+
+    # Intelligence Extraction
+    # "hybrid": local validated patterns + LLM (LLM technical fields are re-validated)
+    # "regex_only": local patterns only, no LLM call
+    INTEL_EXTRACTION_MODE: str = "hybrid"
+    # Names/banks/entities: "llm" or "spacy" (local NER in a process pool, skips the extraction LLM call)
+    NER_BACKEND: str = "llm"
+    NER_MODEL: str = "en_core_web_sm"
+    NER_WORKERS: int = 1
+    NER_BATCH_SIZE: int = 32
+    NER_BATCH_WAIT_MS: float = 5.0
+    HISTORY_HASH_LIMIT: int = 256 # Recent scammer texts remembered per session so resent history isn't re-extracted
+
+    # Result Cache (scam / extraction results keyed on normalized message text)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 10000
+    RESULT_CACHE_TTL: float = 3600.0 # Seconds
+    RESULT_CACHE_DIR: Optional[str] = None # Set to persist caches across restarts
+
     # Callback / Webhook
     CALLBACK_URL: str = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
+    CALLBACK_DEBOUNCE: float = 5.0 # Seconds; reports for one session within this window are merged (latest wins)
+    CALLBACK_WORKERS: int = 4
+    CALLBACK_TIMEOUT: float = 10.0
+    CALLBACK_MAX_RETRIES: int = 5
+    CALLBACK_BACKOFF_BASE: float = 1.0 # Seconds, doubled per attempt (full jitter)
+    CALLBACK_BACKOFF_MAX: float = 60.0
+    # Durable outbox: reports are persisted until acknowledged and resent after a restart
+    CALLBACK_OUTBOX_ENABLED: bool = True
+    CALLBACK_OUTBOX_PATH: str = "callbacks.db"
+    CALLBACK_DRAIN_BATCH: int = 100 # Reports sent concurrently per drain batch on startup
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,145 @@
+import bisect
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; covers cache hits (~ms) up to slow LLM calls hitting their stage timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, le: str = None) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size # Per bucket (non-cumulative); cumulated at render time
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """
+    In-process counters and histograms rendered in Prometheus text format.
+
+    Recording is a dict lookup plus a bisect, so it's cheap enough for the hot path;
+    anything that already keeps its own stats (caches, pools, dispatcher) is read
+    through collectors only when /metrics is scraped.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _labels(labels)
+        series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = _labels(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = _Histogram(len(self.buckets) + 1)
+        hist.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        hist.sum += seconds
+        hist.count += 1
+
+    async def timed(self, stage: str, coro):
+        """Await `coro`, recording its duration under honeypot_stage_seconds{stage=...}."""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.observe("honeypot_stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def stage(self, stage: str):
+        """Context manager version of timed() for synchronous stages."""
+        return _StageTimer(self, stage)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]):
+        """`collector()` yields (gauge_name, labels, value) at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+
+        def header(name: str, kind: str):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, "counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for key, hist in series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, f'{bound:g}')} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, '+Inf')} {hist.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+
+        gauges: Dict[str, List[Tuple[LabelKey, float]]] = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                if value is not None:
+                    gauges.setdefault(name, []).append((_labels(labels), value))
+        for name, series in sorted(gauges.items()):
+            header(name, "gauge")
+            for key, value in series:
+                lines.append(f"{name}{_format_labels(key)} {float(value):g}")
+
+        return "\n".join(lines) + "\n"
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage_name", "start")
+
+    def __init__(self, metrics: Metrics, stage_name: str):
+        self.metrics = metrics
+        self.stage_name = stage_name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe("honeypot_stage_seconds", time.perf_counter() - self.start, stage=self.stage_name)
+        return False
+
+
+metrics = Metrics()
+metrics.describe("honeypot_stage_seconds", "Duration of each request pipeline stage.")
+metrics.describe("honeypot_request_seconds", "End-to-end request handling time per endpoint.")
+metrics.describe("honeypot_stage_timeouts_total", "Stages replaced by their fallback after overrunning their budget.")
+metrics.describe("honeypot_llm_request_seconds", "Upstream LLM call latency per service and model.")
+metrics.describe("honeypot_llm_tokens_total", "LLM tokens used per service, model and kind (prompt/completion).")
+metrics.describe("honeypot_llm_errors_total", "Failed LLM calls per service, model and error type.")
+metrics.describe("honeypot_llm_shed_total", "LLM calls rejected locally by the circuit breaker or concurrency limit.")
@@ -1,20 +1,51 @@
+import json
 import logging
 import time
 import asyncio
+from typing import Optional
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Header, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from app.core.config import settings
+from app.core.clients import clients
+from app.core.metrics import metrics
 from app.schemas.models import IncomingMessage, HoneypotResponse
 from app.services.scam_detector import scam_detector
 from app.services.chat_agent import chat_agent
 from app.services.intelligence import intelligence_extractor
+from app.services.fused_analyzer import fused_analyzer
+from app.services.ner import ner_service
+from app.services.history_tracker import history_tracker
+from app.services.session_scorer import session_scorer
+from app.services.request_coalescer import request_coalescer
 from app.services.session_manager import session_manager
+from app.services.session_record import SessionRecord
 from app.services.callback import callback_service
+from app.services.llm_guard import upstream_guard
+from app.services.llm_router import llm_router
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled upstream client set for the whole app
+    clients.start()
+    callback_service.start()
+    # Session expiry runs on its own schedule instead of piggybacking on requests
+    cleanup_task = asyncio.create_task(session_manager.run_cleanup_loop())
+    yield
+    cleanup_task.cancel()
+    await callback_service.stop()
+    # Keep warm LLM results across restarts (no-op unless RESULT_CACHE_DIR is set)
+    for service in (scam_detector, intelligence_extractor, fused_analyzer):
+        service.cache.save()
+    scam_detector.save_index()
+    ner_service.shutdown()
+    await clients.aclose()
+
+app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json", lifespan=lifespan)
 
 # Fix CORS for Hackathon Tester (since it runs in browser/external domain)
 from fastapi.middleware.cors import CORSMiddleware
@@ -31,75 +62,232 @@ async def verify_api_key(x_api_key: str = Header(...)):
     if x_api_key != settings.API_KEY:
         raise HTTPException(status_code=403, detail="Invalid API Key")
 
+_summaries_in_flight = set()
+
+async def refresh_summary(session_id: str, previous_summary, entries, new_upto: int):
+    """Background: update the rolling conversation summary used by the chat prompt."""
+    try:
+        summary = await chat_agent.summarize(previous_summary, entries)
+        await session_manager.run(session_manager.save_fields, session_id, {"summary": summary, "summary_upto": new_upto})
+    except Exception as e:
+        logger.error(f"Summary update failed for {session_id}: {e}")
+    finally:
+        _summaries_in_flight.discard(session_id)
+
+class Turn:
+    """Per-request state shared by the /message and /message/stream pipelines."""
+
+    def __init__(self, payload: IncomingMessage):
+        # 0. Normalize Payload
+        self.session_id = payload.sessionId if payload.sessionId else "unknown"
+        
+        # Extract message safely (it is now a dict)
+        self.text = ""
+        self.sender = "scammer"
+        if payload.message and isinstance(payload.message, dict):
+            self.text = payload.message.get("text", "")
+            self.sender = payload.message.get("sender") or "scammer"
+        
+        # Fallback
+        if not self.text:
+            self.text = "Hello" # Prevent empty string errors in LLM
+        
+        # Handle optional history (it might be None from permissive schema)
+        self.history = payload.conversationHistory or []
+
+    async def load_session(self):
+        # Retrieve assigned persona from session
+        self.session = await metrics.timed("session_lookup", session_manager.run(session_manager.get_session, self.session_id))
+        self.persona = self.session.get("persona", "elderly") # Fallback to elderly
+        self.summary = self.session.get("summary")
+        self.summarized_upto = min(self.session.get("summary_upto", 0), len(self.history))
+        
+        # Earlier scammer turns we never analyzed (missed or edited); usually none
+        self.backlog, self.history_state = history_tracker.plan(self.session, self.history, self.text, self.sender)
+        # Sessions already confirmed as scams reuse their verdict instead of re-scoring every message
+        self.score_turn = session_scorer.should_score(self.session)
+
+    def session_verdict(self, scam_result):
+        """Session-level verdict once this turn's result is counted (persisted by finalize_turn)."""
+        return session_scorer.update(self.session, scam_result if self.score_turn else None)[1]
+
+async def with_timeout(coro, timeout_ms: float, fallback, stage: str):
+    """Per-stage timeout: a stage that overruns is replaced by its fallback value."""
+    try:
+        return await asyncio.wait_for(coro, timeout_ms / 1000.0)
+    except asyncio.TimeoutError:
+        metrics.inc("honeypot_stage_timeouts_total", stage=stage)
+        logger.warning(f"{stage} exceeded {timeout_ms:.0f}ms, using fallback")
+        return fallback() if callable(fallback) else fallback
+
+async def _extract_turn(turn: Turn):
+    """Intelligence for the new message plus any history backlog."""
+    if turn.backlog:
+        current, backlog = await asyncio.gather(
+            intelligence_extractor.extract(turn.text),
+            intelligence_extractor.extract("\n".join(turn.backlog))
+        )
+        return intelligence_extractor.combine(current, backlog)
+    return await intelligence_extractor.extract(turn.text)
+
+def start_analysis(turn: Turn):
+    """Kick off scam scoring and extraction; returns (scam_task, intel_task)."""
+    # Timeout fallback covers the backlog too: its hashes are persisted as analyzed with this turn
+    regex_only = lambda: intelligence_extractor.merge_llm_fields(
+        intelligence_extractor.regex_extract("\n".join([turn.text, *turn.backlog])), {}
+    )
+    heuristic = lambda: scam_detector.heuristic(turn.text)
+    if not turn.score_turn:
+        # Decided session: only extraction runs
+        scam_task = asyncio.get_running_loop().create_future()
+        scam_task.set_result(session_scorer.verdict(turn.session))
+        intel_task = asyncio.create_task(with_timeout(
+            metrics.timed("intel_llm", _extract_turn(turn)), settings.INTEL_TIMEOUT_MS, regex_only, "intelligence extraction"
+        ))
+        return scam_task, intel_task
+
+    if settings.FUSED_ANALYSIS:
+        # Scam score + intelligence from a single structured call
+        fused_task = asyncio.create_task(with_timeout(
+            metrics.timed("fused_llm", fused_analyzer.analyze(turn.text)), settings.SCAM_TIMEOUT_MS, lambda: (heuristic(), regex_only()), "fused analysis"
+        ))
+
+        async def scam_part():
+            return (await fused_task)[0]
+
+        async def intel_part():
+            intelligence_data = (await fused_task)[1]
+            if turn.backlog:
+                backlog = await intelligence_extractor.extract("\n".join(turn.backlog))
+                intelligence_data = intelligence_extractor.combine(intelligence_data, backlog)
+            return intelligence_data
+
+        return asyncio.create_task(scam_part()), asyncio.create_task(intel_part())
+
+    # Scam detection and Intelligence extraction run in parallel
+    scam_task = asyncio.create_task(with_timeout(
+        metrics.timed("scam_llm", scam_detector.predict(turn.text)), settings.SCAM_TIMEOUT_MS, heuristic, "scam detection"
+    ))
+    intel_task = asyncio.create_task(with_timeout(
+        metrics.timed("intel_llm", _extract_turn(turn)), settings.INTEL_TIMEOUT_MS, regex_only, "intelligence extraction"
+    ))
+    return scam_task, intel_task
+
+async def scam_within_budget(turn: Turn, scam_task, start_time: float):
+    """The scam verdict if it's ready by the response budget, else an instant heuristic one."""
+    remaining = settings.RESPONSE_BUDGET_MS / 1000.0 - (time.time() - start_time)
+    if not scam_task.done() and remaining > 0:
+        await asyncio.wait({scam_task}, timeout=remaining)
+    if scam_task.done():
+        return scam_task.result()
+    return scam_detector.heuristic(turn.text)
+
+async def finish_turn_late(turn: Turn, scam_task, intel_task):
+    """Runs after the response was sent: wait for slow stages, then update the session."""
+    try:
+        scam_result, intelligence_data = await asyncio.gather(scam_task, intel_task)
+        late_tasks = BackgroundTasks()
+        await finalize_turn(turn, scam_result, intelligence_data, late_tasks)
+        await late_tasks()
+    except Exception as e:
+        logger.error(f"Late turn completion failed for {turn.session_id}: {e}")
+
+async def complete_turn(turn: Turn, scam_task, intel_task, background_tasks: BackgroundTasks):
+    """Finalize now if every stage is done, otherwise after the response is sent."""
+    if scam_task.done() and intel_task.done():
+        await finalize_turn(turn, scam_task.result(), intel_task.result(), background_tasks)
+    else:
+        background_tasks.add_task(finish_turn_late, turn, scam_task, intel_task)
+
+async def finalize_turn(turn: Turn, scam_result, intelligence_data, background_tasks: BackgroundTasks):
+    # 2. Update Session (the session scam score is stored next to message_count)
+    scam_fields, verdict = session_scorer.update(turn.session, scam_result if turn.score_turn else None)
+    session = await metrics.timed("session_persist", session_manager.run(
+        session_manager.update_session, turn.session_id, intelligence_data, {**turn.history_state, **scam_fields}
+    ))
+    
+    # Fold turns that slid out of the verbatim window into the summary, after responding
+    new_upto = chat_agent.summary_due(turn.history, turn.summarized_upto)
+    if new_upto is not None and turn.session_id not in _summaries_in_flight:
+        _summaries_in_flight.add(turn.session_id)
+        background_tasks.add_task(
+            refresh_summary, turn.session_id, turn.summary, turn.history[turn.summarized_upto:new_upto], new_upto
+        )
+    
+    # 3. Check for Callback Trigger
+    # Example rule: After 5 messages, send intelligence OR if scam confidence is high
+    # (the dispatcher debounces, so a long scam session still sends one report per window)
+    if session["message_count"] % 5 == 0 or verdict["scamDetected"]:
+        callback_service.submit(
+            turn.session_id, 
+            session["intelligence"],
+            "completed",
+            verdict["scamDetected"],
+            session["message_count"]
+        )
+    return session
+
 @app.post("/message", response_model=HoneypotResponse)
 async def handle_message(
     payload: IncomingMessage, 
     background_tasks: BackgroundTasks,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    idempotency_key: Optional[str] = Header(None)
 ):
     start_time = time.time()
-    
-    # 0. Normalize Payload
-    session_id = payload.sessionId if payload.sessionId else "unknown"
-    
-    # Extract message safely (it is now a dict)
-    user_msg_content = ""
-    if payload.message and isinstance(payload.message, dict):
-        user_msg_content = payload.message.get("text", "")
-    
-    # Fallback
-    if not user_msg_content:
-        user_msg_content = "Hello" # Prevent empty string errors in LLM
+    turn = Turn(payload)
         
-    logger.info(f"Received message for session {session_id}: {user_msg_content}")
+    logger.info(f"Received message for session {turn.session_id}: {turn.text}")
     logger.info(f"Full Payload Raw: {payload.dict()}")
 
+    if not settings.MESSAGE_DEDUP_ENABLED:
+        return await process_message(turn, background_tasks, start_time)
+    # Client/gateway retries of a slow request join the original instead of re-running the turn
+    key = request_coalescer.make_key(turn.session_id, turn.text, len(turn.history), idempotency_key)
+    return await request_coalescer.run(
+        key,
+        lambda: process_message(turn, background_tasks, start_time),
+        cacheable=lambda response: response.status == "success"
+    )
+
+async def process_message(turn: Turn, background_tasks: BackgroundTasks, start_time: float) -> HoneypotResponse:
     try:
         # 1. Parallel Execution of Services
         # We want to respond fast (<500ms target, though LLM might take 1-2s).
         # We must await the LLM reply for the response.
-        # Scam detection and Intelligence extraction can run in parallel.
+        await turn.load_session()
         
-        # Retrieve assigned persona from session
-        session = session_manager.get_session(session_id)
-        persona = session.get("persona", "elderly") # Fallback to elderly
-        
-        # Handle optional history (it might be None from permissive schema)
-        history = payload.conversationHistory or []
-        
-        chat_task = asyncio.create_task(chat_agent.generate_reply(history, user_msg_content, persona_key=persona))
-        scam_task = asyncio.create_task(scam_detector.predict(user_msg_content))
-        # Intelligence is now also an async LLM task
-        intel_task = asyncio.create_task(intelligence_extractor.extract(user_msg_content))
-        
-        # Wait for all
-        reply_text, scam_result, intelligence_data = await asyncio.gather(chat_task, scam_task, intel_task)
-        
-        # 2. Update Session
-        session_manager.update_session(session_id, intelligence_data)
-        session = session_manager.get_session(session_id)
+        chat_task = asyncio.create_task(with_timeout(
+            metrics.timed("chat_llm", chat_agent.generate_reply(
+                turn.history, turn.text, persona_key=turn.persona,
+                summary=turn.summary, summarized_upto=turn.summarized_upto
+            )),
+            settings.CHAT_TIMEOUT_MS, chat_agent.FALLBACK_REPLY, "chat reply"
+        ))
+        scam_task, intel_task = start_analysis(turn)
         
-        # 3. Check for Callback Trigger
-        # Example rule: After 5 messages, send intelligence OR if scam confidence is high
-        if session["message_count"] % 5 == 0 or scam_result.get("scamDetected", False):
-            background_tasks.add_task(
-                callback_service.send_final_report, 
-                session_id, 
-                session["intelligence"],
-                "completed",
-                scam_result.get("scamDetected", False),
-                session["message_count"]
-            )
+        if settings.EARLY_RESPONSE:
+            # Answer as soon as the reply is ready; slow stages finish in the background
+            reply_text = await chat_task
+            scam_result = await scam_within_budget(turn, scam_task, start_time)
+            verdict = turn.session_verdict(scam_result)
+            await complete_turn(turn, scam_task, intel_task, background_tasks)
+        else:
+            # Wait for all
+            reply_text, scam_result, intelligence_data = await asyncio.gather(chat_task, scam_task, intel_task)
+            verdict = turn.session_verdict(scam_result)
+            await finalize_turn(turn, scam_result, intelligence_data, background_tasks)
 
         # 4. Construct Response
         processing_time = (time.time() - start_time) * 1000
+        metrics.observe("honeypot_request_seconds", processing_time / 1000, endpoint="/message")
         logger.info(f"Processed in {processing_time:.2f}ms")
         
         return HoneypotResponse(
             status="success",
             reply=reply_text,
-            scam_detected=scam_result.get("scamDetected", False),
-            confidence_score=scam_result.get("score", 0.0)
+            scam_detected=verdict["scamDetected"],
+            confidence_score=verdict["score"]
         )
     except Exception as e:
         logger.error(f"CRITICAL ERROR in handle_message: {e}")
@@ -111,15 +299,74 @@ async def handle_message(
             confidence_score=0.0
         )
 
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/message/stream")
+async def handle_message_stream(
+    payload: IncomingMessage,
+    background_tasks: BackgroundTasks,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Same pipeline as /message, but the persona reply is streamed as Server-Sent Events:
+    `data: {"text": ...}` per cleaned chunk, then `event: done` carrying the full
+    HoneypotResponse once the session update and callback check have run.
+    """
+    start_time = time.time()
+    turn = Turn(payload)
+    logger.info(f"Received streaming message for session {turn.session_id}: {turn.text}")
+
+    async def event_stream():
+        try:
+            await turn.load_session()
+            scam_task, intel_task = start_analysis(turn)
+            parts = []
+            chat_start = time.perf_counter()
+            async for chunk in chat_agent.stream_reply(
+                turn.history, turn.text, persona_key=turn.persona,
+                summary=turn.summary, summarized_upto=turn.summarized_upto
+            ):
+                parts.append(chunk)
+                yield _sse({"text": chunk})
+            metrics.observe("honeypot_stage_seconds", time.perf_counter() - chat_start, stage="chat_llm")
+            
+            if settings.EARLY_RESPONSE:
+                scam_result = await scam_within_budget(turn, scam_task, start_time)
+                verdict = turn.session_verdict(scam_result)
+                await complete_turn(turn, scam_task, intel_task, background_tasks)
+            else:
+                scam_result, intelligence_data = await asyncio.gather(scam_task, intel_task)
+                verdict = turn.session_verdict(scam_result)
+                await finalize_turn(turn, scam_result, intelligence_data, background_tasks)
+            
+            processing_time = (time.time() - start_time) * 1000
+            metrics.observe("honeypot_request_seconds", processing_time / 1000, endpoint="/message/stream")
+            logger.info(f"Streamed in {processing_time:.2f}ms")
+            yield _sse(HoneypotResponse(
+                status="success",
+                reply="".join(parts),
+                scam_detected=verdict["scamDetected"],
+                confidence_score=verdict["score"]
+            ).dict(), event="done")
+        except Exception as e:
+            logger.error(f"CRITICAL ERROR in handle_message_stream: {e}")
+            yield _sse({"status": "error", "reply": f"DEBUG ERROR: {str(e)}"}, event="error")
+
+    # Background tasks added while streaming still run once the stream completes
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 # Add root endpoint for robustness (Hackathon Tester Safe-guard)
 @app.post("/", response_model=HoneypotResponse)
 async def root_handle_message(
     payload: IncomingMessage, 
     background_tasks: BackgroundTasks,
-    api_key: str = Depends(verify_api_key)
+    api_key: str = Depends(verify_api_key),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """Mirror of /message for testers that forget the path"""
-    return await handle_message(payload, background_tasks, api_key)
+    return await handle_message(payload, background_tasks, api_key, idempotency_key)
 
 @app.get("/")
 def root_status():
@@ -131,19 +378,8 @@ from app.schemas.models import SessionSummary
 @app.get("/sessions", response_model=List[SessionSummary])
 async def list_sessions(api_key: str = Depends(verify_api_key)):
     """List all active honeypot sessions"""
-    # This is a direct access to the internal session store.
-    # In a real DB, this would be a query.
-    # We map the raw dict to the schema.
     sessions = []
-    
-    # We need to access the private _sessions safely
-    # Ideally, session_manager should have a list_sessions() method
-    # But for hackathon speed, we'll access the property if possible
-    # Let's add a safe method to SessionManager first? 
-    # Or just iterate since it's in-memory.
-    
-    all_data = session_manager._sessions # Accessing protected member for speed
-    for sid, data in all_data.items():
+    for sid, data in await session_manager.run(session_manager.list_sessions):
         sessions.append(SessionSummary(
             sessionId=sid,
             message_count=data.get("message_count", 0),
@@ -155,9 +391,70 @@ async def list_sessions(api_key: str = Depends(verify_api_key)):
 @app.get("/session/{session_id}")
 async def get_session_details(session_id: str, api_key: str = Depends(verify_api_key)):
     """Get full intelligence for a specific session"""
-    session = session_manager.get_session(session_id)
-    return session
+    session = (await session_manager.run(session_manager.get_session, session_id)).to_dict()
+    # Only the public record; watermarks, hashes, scorer state and the summary are internal bookkeeping
+    return {key: session[key] for key in (*SessionRecord.CORE_FIELDS, "intelligence")}
+
+from app.services.ioc_index import KINDS as IOC_KINDS, SEARCH_MODES as IOC_SEARCH_MODES
+
+@app.get("/intel/search")
+async def search_intelligence(
+    q: str,
+    kind: Optional[str] = None,
+    mode: str = "exact",
+    limit: int = 50,
+    api_key: str = Depends(verify_api_key)
+):
+    """Which sessions saw an indicator: exact value, value prefix, or a domain and its subdomains"""
+    if mode not in IOC_SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(IOC_SEARCH_MODES)}")
+    if kind is not None and kind not in IOC_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(IOC_KINDS)}")
+    matches = await session_manager.run(session_manager.search_iocs, q, kind, mode, max(1, min(limit, 500)))
+    return {"query": q, "mode": mode, "matches": matches}
+
+def _service_stats():
+    """Scrape-time gauges from the stats each component already keeps."""
+    for service in (scam_detector, intelligence_extractor, fused_analyzer):
+        cache = service.cache
+        yield "honeypot_cache_entries", {"cache": cache.name}, len(cache._entries)
+        for event, value in cache.stats.items():
+            yield "honeypot_cache_events", {"cache": cache.name, "event": event}, value
+    for path, value in scam_detector.stats.items():
+        yield "honeypot_scam_decisions", {"path": path}, value
+    for turns, value in session_scorer.stats.items():
+        yield "honeypot_scam_session_turns", {"scoring": turns}, value
+    for event, value in request_coalescer.stats.items():
+        yield "honeypot_message_dedup", {"event": event}, value
+    for stat, value in scam_detector.batcher.stats.items():
+        yield "honeypot_scam_batcher", {"stat": stat}, value
+    if scam_detector._index is not None:
+        index = scam_detector._index
+        for stat, value in {"references": len(index), **index.stats}.items():
+            yield "honeypot_scam_index", {"stat": stat}, value
+    for stat, value in ner_service.stats.items():
+        yield "honeypot_ner", {"stat": stat}, value
+    for pool, stats in clients.stats().items():
+        for stat, value in stats.items():
+            yield "honeypot_http_pool", {"pool": pool, "stat": stat}, value
+    for stat, value in callback_service.stats().items():
+        yield "honeypot_callbacks", {"stat": stat}, value
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    for upstream, stats in upstream_guard.stats().items():
+        yield "honeypot_llm_breaker_state", {"upstream": upstream}, states[stats["state"]]
+        yield "honeypot_llm_concurrency_limit", {"upstream": upstream}, stats["limit"]
+        yield "honeypot_llm_in_flight", {"upstream": upstream}, stats["in_flight"]
+    for upstream, stats in llm_router.stats().items():
+        yield "honeypot_llm_route_latency_ms", {"upstream": upstream}, stats["latency_ms"]
+        yield "honeypot_llm_route_error_rate", {"upstream": upstream}, stats["error_rate"]
+
+metrics.register_collector(_service_stats)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition (unauthenticated, like /health, so scrapers need no key)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "http_pools": clients.stats(), "callbacks": callback_service.stats(), "llm_upstreams": upstream_guard.stats(), "llm_routes": llm_router.stats()}
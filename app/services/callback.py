@@ -1,18 +1,61 @@
-import httpx
+import asyncio
 import logging
-from typing import Dict, Any
+import random
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+from app.core.clients import clients
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.callback_outbox import CallbackOutbox
+
+
+class _Report:
+    __slots__ = ("session_id", "version", "payload", "created", "attempts")
+
+    def __init__(self, session_id: str, version: int, payload: Dict[str, Any], created: float):
+        self.session_id = session_id
+        self.version = version # message_count the report describes
+        self.payload = payload
+        self.created = created # When the oldest state folded into this report was submitted
+        self.attempts = 0
+
 
 class CallbackService:
+    """
+    Debounced, coalescing delivery of final reports.
+
+    submit() only records the latest report per session; it's sent CALLBACK_DEBOUNCE
+    seconds after the first un-sent submission, so a burst of turns produces one
+    callback carrying the newest state. Sends go through a fixed pool of worker tasks
+    on the shared HTTP client. Non-200s and errors are retried with capped exponential
+    backoff and full jitter; a newer submission for the same session replaces a
+    report that is waiting to be retried.
+
+    With CALLBACK_OUTBOX_ENABLED every report is also written to a SQLite outbox
+    (by its writer thread, off the event loop) and removed once acknowledged; whatever is left there (crash,
+    restart, retries exhausted) is drained in batches on the next start.
+    """
+
     def __init__(self):
-        # Load from settings to allow override
-        from app.core.config import settings
         self.callback_url = settings.CALLBACK_URL
-    
-    async def send_final_report(self, session_id: str, intelligence: Dict[str, Any], status: str = "completed", scam_detected: bool = False, message_count: int = 0):
-        # Flatten extracted_data if needed, but the requirement basically asks for 
+        self._pending: Dict[str, _Report] = {} # Latest un-sent report per session
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._sending = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop = None
+        self._latencies = deque(maxlen=1000) # Submit -> delivered, seconds
+        self.counters = {"submitted": 0, "coalesced": 0, "delivered": 0, "retries": 0, "failed": 0, "drained": 0}
+        self.outbox = CallbackOutbox(settings.CALLBACK_OUTBOX_PATH) if settings.CALLBACK_OUTBOX_ENABLED else None
+        self._drain_task: Optional[asyncio.Task] = None
+
+    def build_payload(self, session_id: str, intelligence: Dict[str, Any], status: str = "completed", scam_detected: bool = False, message_count: int = 0) -> Dict[str, Any]:
+        # Flatten extracted_data if needed, but the requirement basically asks for
         # specific top-level keys that match the validation error.
-        
-        payload = {
+        # Snapshot the lists: the session record keeps changing while the report waits
+        intelligence = {key: list(values) for key, values in intelligence.items()}
+        return {
             "sessionId": session_id,
             "status": status,
             "scamDetected": scam_detected,
@@ -21,18 +64,200 @@ class CallbackService:
             "extracted_data": intelligence, # Keep this for backward compat if needed, or redundancy
             "agentNotes": f"Session processed by Agentic Honeypot. Scam Detected: {scam_detected}. Intelligence gathered."
         }
-        
-        async with httpx.AsyncClient() as client:
+
+    # --- Dispatcher ---
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._workers and self._loop is loop:
+            return
+        self._loop = loop
+        # Timers from a previous (closed) loop will never fire; re-arm everything still pending
+        self._timers = {}
+        self._sending.clear()
+        self._queue = asyncio.Queue()
+        for session_id in self._pending:
+            self._schedule(session_id, settings.CALLBACK_DEBOUNCE)
+        if self.outbox is not None and self._drain_task is None:
+            # Reports left over from the previous process
+            self._drain_task = asyncio.create_task(self._drain_outbox())
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(settings.CALLBACK_WORKERS)]
+
+    async def stop(self):
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
+        tasks = self._workers + ([self._drain_task] if self._drain_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._drain_task = None
+        if self.outbox is not None:
+            await asyncio.to_thread(self.outbox.flush)
+        if self._pending:
+            if self.outbox is not None:
+                logging.info(f"{len(self._pending)} undelivered callbacks kept in the outbox for next start")
+            else:
+                logging.warning(f"Dropping {len(self._pending)} undelivered callbacks on shutdown")
+
+    def submit(self, session_id: str, intelligence: Dict[str, Any], status: str = "completed", scam_detected: bool = False, message_count: int = 0):
+        """Queue a report for `session_id`; replaces any report of that session not sent yet."""
+        self.start() # No-op once the lifespan started it
+        self.counters["submitted"] += 1
+        payload = self.build_payload(session_id, intelligence, status, scam_detected, message_count)
+        if self.outbox is not None:
+            # Queued for the outbox writer thread, which commits it well before the debounce
+            # ends; once committed, a crash means a resend, never a loss
+            self.outbox.put(session_id, message_count, payload)
+        report = self._pending.get(session_id)
+        if report is not None:
+            # Latest state wins; keep the original timer so delivery isn't pushed back forever
+            self.counters["coalesced"] += 1
+            if message_count >= report.version: # A late-finishing older turn doesn't roll it back
+                report.version = message_count
+                report.payload = payload
+                report.attempts = 0
+        else:
+            self._pending[session_id] = _Report(session_id, message_count, payload, time.time())
+        if session_id not in self._timers:
+            self._schedule(session_id, settings.CALLBACK_DEBOUNCE)
+
+    def _schedule(self, session_id: str, delay: float):
+        loop = asyncio.get_running_loop()
+        self._timers[session_id] = loop.call_later(delay, self._enqueue, session_id)
+
+    def _enqueue(self, session_id: str):
+        self._timers.pop(session_id, None)
+        self._queue.put_nowait(session_id)
+
+    def _backoff(self, attempts: int) -> float:
+        # Full jitter: uniform over [0, min(cap, base * 2^n)]
+        cap = min(settings.CALLBACK_BACKOFF_MAX, settings.CALLBACK_BACKOFF_BASE * (2 ** (attempts - 1)))
+        return random.uniform(0, cap)
+
+    async def _worker(self):
+        while True:
+            session_id = await self._queue.get()
             try:
-                # Fire and forget or await? Usually fire-and-forget for speed, 
-                # but let's await with timeout to log errors.
-                logging.info(f"Sending callback for session {session_id} to {self.callback_url}")
-                response = await client.post(self.callback_url, json=payload, timeout=10.0)
-                if response.status_code != 200:
-                    logging.error(f"Callback failed: {response.status_code} {response.text}")
-                else:
-                    logging.info("Callback successful")
+                await self._dispatch(session_id)
             except Exception as e:
-                logging.error(f"Callback error: {e}")
+                logging.error(f"Callback dispatch error for {session_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _dispatch(self, session_id: str):
+        if session_id in self._sending:
+            # An older report of this session is still on the wire; keep reports in order
+            if session_id not in self._timers:
+                self._schedule(session_id, settings.CALLBACK_DEBOUNCE)
+            return
+        report = self._pending.pop(session_id, None)
+        if report is None:
+            return
+
+        self._sending.add(session_id)
+        try:
+            ok = await self._deliver(report.payload, CallbackOutbox.idempotency_key(session_id, report.version))
+        finally:
+            self._sending.discard(session_id)
+        self._settle(report, ok)
+
+    def _settle(self, report: _Report, ok: bool):
+        """Book-keeping after a send: ack it, or schedule a retry."""
+        session_id = report.session_id
+        if ok:
+            self.counters["delivered"] += 1
+            self._latencies.append(time.time() - report.created)
+            if self.outbox is not None:
+                self.outbox.ack([(session_id, report.version)])
+            return
+        if self.outbox is not None:
+            self.outbox.record_attempt(session_id, report.version)
+        if session_id in self._pending:
+            return # Superseded by a newer report, which has its own timer
+        report.attempts += 1
+        if report.attempts > settings.CALLBACK_MAX_RETRIES:
+            self.counters["failed"] += 1
+            where = "parked in the outbox until restart" if self.outbox is not None else "dropped"
+            logging.error(f"Callback for session {session_id} {where} after {report.attempts} attempts")
+            return
+        self.counters["retries"] += 1
+        self._pending[session_id] = report
+        self._schedule(session_id, self._backoff(report.attempts))
+
+    async def _drain_outbox(self):
+        """Resend everything the outbox still holds, CALLBACK_DRAIN_BATCH reports at a time."""
+        after = None
+        try:
+            while True:
+                batch = await asyncio.to_thread(self.outbox.fetch_batch, settings.CALLBACK_DRAIN_BATCH, after)
+                if not batch:
+                    break
+                after = batch[-1][0]
+                reports = []
+                for session_id, version, payload, created in batch:
+                    if session_id in self._pending or session_id in self._sending:
+                        continue # Already resubmitted by this process with newer state
+                    reports.append(_Report(session_id, version, payload, created))
+                    self._sending.add(session_id)
+                try:
+                    # The whole batch goes out concurrently over the shared pool
+                    results = await asyncio.gather(*[
+                        self._deliver(r.payload, CallbackOutbox.idempotency_key(r.session_id, r.version)) for r in reports
+                    ])
+                finally:
+                    for r in reports:
+                        self._sending.discard(r.session_id)
+                delivered = [(r.session_id, r.version) for r, ok in zip(reports, results) if ok]
+                self.outbox.ack(delivered) # One transaction per batch
+                self.counters["drained"] += len(delivered)
+                self.counters["delivered"] += len(delivered)
+                for r, ok in zip(reports, results):
+                    if not ok:
+                        self._settle(r, False)
+            if after is not None:
+                logging.info(f"Callback outbox drained ({self.counters['drained']} delivered)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Callback outbox drain failed: {e}")
+
+    async def _deliver(self, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> bool:
+        # Shared pooled client: keep-alive connection to the callback host is reused
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        start = time.perf_counter()
+        try:
+            logging.info(f"Sending callback for session {payload['sessionId']} to {self.callback_url}")
+            response = await clients.http.post(self.callback_url, json=payload, headers=headers, timeout=settings.CALLBACK_TIMEOUT)
+            if response.status_code != 200:
+                logging.error(f"Callback failed: {response.status_code} {response.text}")
+                return False
+            logging.info("Callback successful")
+            return True
+        except Exception as e:
+            logging.error(f"Callback error: {e}")
+            return False
+        finally:
+            metrics.observe("honeypot_stage_seconds", time.perf_counter() - start, stage="callback")
+
+    async def send_final_report(self, session_id: str, intelligence: Dict[str, Any], status: str = "completed", scam_detected: bool = False, message_count: int = 0) -> bool:
+        """Immediate one-shot send, bypassing the debounce queue."""
+        payload = self.build_payload(session_id, intelligence, status, scam_detected, message_count)
+        return await self._deliver(payload, CallbackOutbox.idempotency_key(session_id, message_count))
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else None
+        return {
+            **self.counters,
+            "pending": len(self._pending), # Debouncing or waiting for a retry
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sending": len(self._sending),
+            "workers": len(self._workers),
+            "outbox": self.outbox.count() if self.outbox is not None else None,
+            "latency_p50_s": pick(0.5),
+            "latency_p95_s": pick(0.95)
+        }
 
 callback_service = CallbackService()
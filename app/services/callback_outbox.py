@@ -0,0 +1,152 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class CallbackOutbox:
+    """
+    Durable store for callback reports that haven't been acknowledged yet.
+
+    One row per session holding the newest report (same latest-wins rule as the
+    dispatcher). A report is written here before it is sent and deleted only after a
+    200, so anything in flight or failing when the process dies is resent on the next
+    startup (at-least-once). The version is the session's message_count, so
+    "session_id:version" identifies one session state and is sent as the idempotency key.
+
+    Writes (put / ack / record_attempt) are handed to a single writer thread, the same
+    way SessionJournal works, so the event loop never waits on SQLite locks or fsync.
+    The writer applies them in submission order, so an ack can't overtake the put it
+    acknowledges, and a burst is committed as one transaction. The window between
+    put() returning and the row being committed is the writer's queue lag (normally
+    milliseconds); flush() waits for it.
+    """
+
+    _STOP = object()
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS callback_outbox (
+            session_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            created REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    @staticmethod
+    def idempotency_key(session_id: str, version: int) -> str:
+        return f"{session_id}:{version}"
+
+    def put(self, session_id: str, version: int, payload: Dict[str, Any]):
+        # Serialize now so later changes to the payload can't race the writer thread
+        self._submit((self._PUT, (session_id, version, json.dumps(payload), time.time())))
+
+    def ack(self, acked: List[Tuple[str, int]]):
+        """Remove delivered reports; a newer version written meanwhile stays queued."""
+        if acked:
+            self._submit((self._ACK, list(acked)))
+
+    def record_attempt(self, session_id: str, version: int):
+        self._submit((self._ATTEMPT, (session_id, version)))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until every write queued so far is committed."""
+        done = threading.Event()
+        self._submit(done)
+        return done.wait(timeout)
+
+    # An older report still queued for this session is superseded; never roll a newer one back
+    _PUT = (
+        "INSERT INTO callback_outbox (session_id, version, payload, created) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(session_id) DO UPDATE SET version = excluded.version, payload = excluded.payload, attempts = 0 "
+        "WHERE excluded.version >= callback_outbox.version"
+    )
+    _ACK = "DELETE FROM callback_outbox WHERE session_id = ? AND version <= ?"
+    _ATTEMPT = "UPDATE callback_outbox SET attempts = attempts + 1 WHERE session_id = ? AND version = ?"
+
+    # --- Writer ---
+
+    def _submit(self, item: Any):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="callback-outbox", daemon=True)
+                    self._thread.start()
+        self._queue.put(item)
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            # Drain whatever else is queued so a burst becomes a single transaction
+            writes, waiters = [], []
+            while item is not None:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    writes.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            if writes:
+                self._apply(writes)
+            for waiter in waiters:
+                waiter.set()
+
+    def _apply(self, writes: List[Tuple[str, Any]]):
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for sql, params in writes:
+                        if sql is self._ACK:
+                            self._conn.executemany(sql, params)
+                        else:
+                            self._conn.execute(sql, params)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            except Exception as e:
+                logging.error(f"Callback outbox write failed ({len(writes)} ops): {e}")
+
+    def fetch_batch(self, limit: int, after: Optional[str] = None) -> List[Tuple[str, int, Dict[str, Any], float]]:
+        """Up to `limit` queued reports ordered by session_id (keyset paging from `after`)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, version, payload, created FROM callback_outbox "
+                "WHERE session_id > ? ORDER BY session_id LIMIT ?",
+                (after or "", limit)
+            ).fetchall()
+        return [(sid, version, json.loads(payload), created) for sid, version, payload, created in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM callback_outbox").fetchone()[0]
+
+    def close(self):
+        """Commit pending writes, stop the writer and close the database."""
+        if self._thread is not None:
+            self._queue.put(self._STOP)
+            self._thread.join(timeout=10)
+            self._thread = None
+        with self._lock:
+            self._conn.close()
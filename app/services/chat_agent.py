@@ -1,15 +1,87 @@
-from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.llm import chat_completion
 from app.schemas.models import Message
-from typing import List, Any
+from typing import List, Any, Dict, Optional, Tuple
 import logging
+import re
+
+# Action descriptions removed from replies, applied in this order: *actions*, [actions], (actions).
+# '.' doesn't match a newline, so an opener only pairs with a closer on the same line.
+ACTION_PAIRS = (("*", "*"), ("[", "]"), ("(", ")"))
+ACTION_PATTERNS = tuple(re.compile(re.escape(opener) + r".*?" + re.escape(closer)) for opener, closer in ACTION_PAIRS)
+
+def strip_actions(text: str) -> str:
+    for pattern in ACTION_PATTERNS:
+        text = pattern.sub("", text)
+    return text.strip()
+
+class _PairStripper:
+    """Streaming equivalent of one ACTION_PATTERNS re.sub pass."""
+
+    def __init__(self, opener: str, closer: str):
+        self.opener = opener
+        self.closer = closer
+        self._held = None # Text from an unmatched opener onwards, or None
+
+    def feed(self, text: str) -> str:
+        out = []
+        for ch in text:
+            if self._held is None:
+                if ch == self.opener:
+                    self._held = ch
+                else:
+                    out.append(ch)
+            elif ch == self.closer:
+                self._held = None # Matched: the whole span is dropped
+            elif ch == "\n":
+                # No closer on this line, so the opener was literal text (and nothing after it can match either)
+                out.append(self._held + ch)
+                self._held = None
+            else:
+                self._held += ch
+        return "".join(out)
+
+    def finish(self) -> str:
+        # An opener that never closed isn't an action (the regex leaves it alone too)
+        leftover, self._held = self._held or "", None
+        return leftover
+
+class ActionStripper:
+    """
+    Incremental strip_actions() for token streams: one _PairStripper per pattern, chained in
+    the same order, so each pass sees exactly the text the previous re.sub would leave.
+    Text inside an open bracket is held back until it closes (then dropped) or the line ends.
+    Leading whitespace is dropped and trailing whitespace is held until more text arrives,
+    so the concatenated output equals strip_actions() on the whole reply.
+    """
 
-class ChatAgent:
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=settings.LLM_API_KEY,
-            base_url=settings.LLM_BASE_URL
-        )
+        self._stages = [_PairStripper(opener, closer) for opener, closer in ACTION_PAIRS]
+        self._pending_ws = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        for stage in self._stages:
+            chunk = stage.feed(chunk)
+        return self._emit(chunk)
+
+    def finish(self) -> str:
+        text = ""
+        for stage in self._stages:
+            # Whatever an earlier stage releases still has to go through the later ones
+            text = stage.feed(text) + stage.finish()
+        return self._emit(text)
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        text = self._pending_ws + text
+        stripped = text.rstrip()
+        self._pending_ws = text[len(stripped):]
+        return stripped
+
+class ChatAgent:
     PERSONAS = {
         "elderly": (
             "You are a polite, engaging elderly woman named Betsy. "
@@ -44,13 +116,34 @@ class ChatAgent:
         )
     }
 
-    def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=settings.LLM_API_KEY,
-            base_url=settings.LLM_BASE_URL
-        )
+    SUMMARY_PROMPT = (
+        "You maintain running notes on a phone/chat conversation between a suspected scammer ('Caller') "
+        "and the person they contacted ('Me'). Update the notes with the new lines. "
+        "Keep every concrete detail the Caller gave (names, organisations, amounts, accounts, links, phone numbers, "
+        "deadlines, threats) and what Me has already said or promised. "
+        "Write at most 80 words of plain prose. Return only the notes."
+    )
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # ~4 characters per token for English chat text, plus per-message framing
+        return len(text) // 4 + 4
 
-    async def generate_reply(self, history: List[Any], new_message: str, persona_key: str = "elderly") -> str:
+    @staticmethod
+    def _unpack(msg: Any) -> Tuple[str, str]:
+        # Handle Permissive Types (Dict or Object)
+        if isinstance(msg, dict):
+            return msg.get("sender", "user"), msg.get("text", "") or ""
+        return getattr(msg, "sender", "user"), getattr(msg, "text", "") or ""
+
+    def build_messages(self, history: List[Any], new_message: str, persona_key: str = "elderly", summary: Optional[str] = None, summarized_upto: int = 0) -> List[Dict[str, str]]:
+        """
+        Token-budgeted prompt: persona + rolling summary of older turns + every turn the
+        summary doesn't cover yet, verbatim (trimmed oldest-first to fit
+        CHAT_PROMPT_TOKEN_BUDGET). summary_due() folds turns into the summary once more
+        than CHAT_RECENT_TURNS are pending, so prompt size stays flat however long the
+        session runs, and nothing falls between the summary and the verbatim window.
+        """
         system_prompt = self.PERSONAS.get(persona_key, self.PERSONAS["elderly"])
         
         # Add dynamic instruction for realism: Polite Confusion > Suspicion
@@ -68,42 +161,133 @@ class ChatAgent:
         )
 
         messages = [{"role": "system", "content": system_prompt}]
+        budget = settings.CHAT_PROMPT_TOKEN_BUDGET - self.estimate_tokens(system_prompt) - self.estimate_tokens(new_message)
         
+        # Older turns only appear through the summary
+        if summary and summarized_upto > 0:
+            note = f"Notes on the conversation so far: {summary}"
+            messages.append({"role": "system", "content": note})
+            budget -= self.estimate_tokens(note)
+
         # Convert history format
         # History items are objects with sender="scammer"|"user" and text="..."
-        for msg in history:
-            # Handle Permissive Types (Dict or Object)
-            if isinstance(msg, dict):
-                sender = msg.get("sender", "user")
-                text = msg.get("text", "")
-            else:
-                sender = getattr(msg, "sender", "user")
-                text = getattr(msg, "text", "")
-
+        recent = []
+        for msg in reversed(history[summarized_upto:]):
+            sender, text = self._unpack(msg)
+            cost = self.estimate_tokens(text)
+            if cost > budget:
+                break
+            budget -= cost
             role = "user" if sender == "scammer" else "assistant"
-            messages.append({"role": role, "content": text})
+            recent.append({"role": role, "content": text})
+        messages.extend(reversed(recent))
             
         messages.append({"role": "user", "content": new_message})
+        return messages
+
+    def summary_due(self, history: List[Any], summarized_upto: int) -> Optional[int]:
+        """New summarized_upto if enough turns have slid out of the verbatim window, else None."""
+        target = len(history) - settings.CHAT_RECENT_TURNS
+        if target - summarized_upto >= settings.CHAT_SUMMARY_BATCH:
+            return target
+        return None
+
+    async def summarize(self, previous_summary: Optional[str], entries: List[Any]) -> str:
+        """Fold `entries` into the running summary. Raises on failure so callers keep the old one."""
+        lines = []
+        for msg in entries:
+            sender, text = self._unpack(msg)
+            lines.append(f"{'Caller' if sender == 'scammer' else 'Me'}: {text}")
+        content = f"Current notes: {previous_summary or '(none)'}\n\nNew lines:\n" + "\n".join(lines)
+        response = await chat_completion(
+            "chat_summary",
+            messages=[
+                {"role": "system", "content": self.SUMMARY_PROMPT},
+                {"role": "user", "content": content}
+            ],
+            max_tokens=160,
+            temperature=0.0,
+            timeout=settings.INTEL_TIMEOUT_MS / 1000.0 # Background job, not on the reply path
+        )
+        return response.choices[0].message.content.strip()
+
+    FALLBACK_REPLY = "Sorry, I didn't catch that. Could you repeat it?"
+
+    async def generate_reply(self, history: List[Any], new_message: str, persona_key: str = "elderly", summary: Optional[str] = None, summarized_upto: int = 0) -> str:
+        messages = self.build_messages(history, new_message, persona_key, summary, summarized_upto)
+        
+        try:
+            if settings.CHAT_HEDGE_AFTER_MS > 0:
+                return await self._complete_hedged(messages, settings.CHAT_HEDGE_AFTER_MS / 1000.0)
+            return await self._complete(messages)
+        except Exception as e:
+            logging.error(f"LLM Error: {e}")
+            return self.FALLBACK_REPLY
+
+    async def _complete_hedged(self, messages: List[Dict[str, str]], hedge_after: float) -> str:
+        """Tail-latency hedge: if the first call is slow, race an identical second one and keep the winner."""
+        import asyncio
+        primary = asyncio.create_task(self._complete(messages))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.create_task(self._complete(messages))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _complete(self, messages: List[Dict[str, str]]) -> str:
+        response = await chat_completion(
+            "chat",
+            messages=messages,
+            max_tokens=60, # Allow slightly more for variety
+            temperature=0.8, # Higher creativity
+            timeout=settings.CHAT_TIMEOUT_MS / 1000.0
+        )
+        raw_content = response.choices[0].message.content.strip()
         
+        # Post-processing: Remove all action descriptions between *...*, [...] and (...)
+        # This ensures compliance even if the LLM ignores instructions
+        return strip_actions(raw_content)
+
+    async def stream_reply(self, history: List[Any], new_message: str, persona_key: str = "elderly", summary: Optional[str] = None, summarized_upto: int = 0):
+        """Async generator of cleaned reply chunks as the LLM produces them."""
+        messages = self.build_messages(history, new_message, persona_key, summary, summarized_upto)
+        stripper = ActionStripper()
+        emitted = False
         try:
-            response = await self.client.chat.completions.create(
-                model=settings.LLM_MODEL,
+            stream = await chat_completion(
+                "chat",
                 messages=messages,
-                max_tokens=60, # Allow slightly more for variety
-                temperature=0.8 # Higher creativity
+                max_tokens=60,
+                temperature=0.8,
+                stream=True,
+                timeout=settings.CHAT_TIMEOUT_MS / 1000.0
             )
-            raw_content = response.choices[0].message.content.strip()
-            
-            # Post-processing: Remove all action descriptions between *...* and [...]
-            # This ensures compliance even if the LLM ignores instructions
-            import re
-            clean_content = re.sub(r'\*.*?\*', '', raw_content) # Remove *actions*
-            clean_content = re.sub(r'\[.*?\]', '', clean_content) # Remove [actions]
-            clean_content = re.sub(r'\(.*?\)', '', clean_content) # Remove (actions) - CAREFUL: use sparingly if risky
-            
-            return clean_content.strip()
+            async for event in stream:
+                if not event.choices:
+                    continue
+                text = stripper.feed(event.choices[0].delta.content or "")
+                if text:
+                    emitted = True
+                    yield text
+            tail = stripper.finish()
+            if tail:
+                yield tail
         except Exception as e:
-            logging.error(f"LLM Error: {e}")
-            return "Sorry, I didn't catch that. Could you repeat it?"
+            logging.error(f"LLM Stream Error: {e}")
+            if not emitted:
+                yield self.FALLBACK_REPLY
 
 chat_agent = ChatAgent()
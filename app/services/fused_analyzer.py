@@ -0,0 +1,94 @@
+import json
+import logging
+from typing import Dict, List, Tuple
+from app.core.config import settings
+from app.services.llm import chat_completion
+from app.services.scam_detector import scam_detector
+from app.services.intelligence import intelligence_extractor
+from app.services.result_cache import ResultCache
+from app.services.llm_router import llm_router
+from app.services.llm_guard import UpstreamUnavailable
+
+class FusedAnalyzer:
+    """
+    Scam scoring + intelligence extraction in a single structured-output LLM call.
+    Both used to send the same user text at temperature 0 with JSON output, so one
+    call saves a full round-trip per message. Results keep the exact shapes of
+    ScamDetector.predict and IntelligenceExtractor.extract.
+    """
+
+    def __init__(self):
+        self.system_prompt = (
+            "You are a Scam Detection and Intelligence Extraction AI. Analyze the user's message. "
+            "Determine if it has scam intent (phishing, financial fraud, urgency, asking for sensitive info), "
+            "and extract PROPER NOUNS and FINANCIAL DETAILS from it. "
+            "Return ONLY a JSON object with these keys: "
+            "'score' (float 0.0-1.0), 'scamDetected' (boolean), 'reason' (string), "
+            "and the following lists (use empty lists if not found): "
+            "'person_names': Names of people. "
+            "'bank_names': Names of banks (e.g., 'Chase', 'HDFC'). "
+            "'account_numbers': Any banking account numbers (digits). "
+            "'ifsc_codes': Bank routing/IFSC codes. "
+            "'crypto_wallets': Wallet addresses. "
+            "'upi_ids': Payment IDs (e.g. name@bank). "
+            "'phone_numbers': Contact numbers. "
+            "'urls': Websites/Links. "
+            "'entities': Any other proper nouns (Locations, Companies). "
+            "Do NOT extract generic words (money, help, call)."
+        )
+        self.cache = ResultCache(
+            "fused", settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL, settings.RESULT_CACHE_DIR
+        )
+
+    async def analyze(self, text: str) -> Tuple[Dict, Dict[str, List[str]]]:
+        """Returns (scam_result, intelligence_data)."""
+        # If local rules already settle the scam verdict, only extraction needs the LLM
+        local = scam_detector.local_verdict(text)
+        if local is not None:
+            return local, await intelligence_extractor.extract(text)
+
+        scam_detector.stats["llm"] += 1
+        extracted = intelligence_extractor.regex_extract(text)
+        try:
+            if settings.RESULT_CACHE_ENABLED:
+                key = ResultCache.make_key(text, llm_router.cache_namespace("fused"))
+                data = await self.cache.get_or_compute(key, lambda: self._analyze_llm(text))
+            else:
+                data = await self._analyze_llm(text)
+        except UpstreamUnavailable:
+            # Upstream is shedding load: local score + validated patterns
+            return scam_detector.heuristic(text, "LLM unavailable"), intelligence_extractor.merge_llm_fields(extracted, {})
+        except Exception as e:
+            logging.error(f"Fused Analysis Error: {e}")
+            # Same fail-safes as the individual services
+            return (
+                {"score": 0.0, "scamDetected": False, "reason": "Error during analysis"},
+                intelligence_extractor.merge_llm_fields(extracted, {})
+            )
+
+        try:
+            score = float(data.get("score", 0.0))
+        except (TypeError, ValueError):
+            score = 0.0
+        scam_result = {
+            "score": score,
+            "scamDetected": bool(data.get("scamDetected", False)),
+            "reason": str(data.get("reason", ""))
+        }
+        return scam_result, intelligence_extractor.merge_llm_fields(extracted, data)
+
+    async def _analyze_llm(self, text: str) -> Dict:
+        response = await chat_completion(
+            "fused",
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": text}
+            ],
+            max_tokens=300,
+            temperature=0.0,
+            timeout=settings.SCAM_TIMEOUT_MS / 1000.0,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
+
+fused_analyzer = FusedAnalyzer()
@@ -0,0 +1,90 @@
+import hashlib
+from typing import Any, Dict, List, Tuple
+from app.core.config import settings
+
+
+class HistoryTracker:
+    """
+    Tracks which conversationHistory entries a session has already analyzed.
+
+    Clients resend the whole history every turn. The session keeps:
+      - history_watermark:   how many history entries have been checked
+      - history_prefix_hash: chained hash of those entries (each entry's normalized
+                             content hash, in order)
+      - analyzed_hashes:     {content hash: turn} of the last HISTORY_HASH_LIMIT scammer
+                             texts extracted, oldest first
+    Every turn the entries below the watermark are re-hashed (cheap, no extraction) and
+    compared with the prefix hash. If they still match, only entries past the watermark
+    are looked at. If the history shrank or any earlier entry was edited, inserted or
+    removed, the whole history is rescanned, and scammer texts not in analyzed_hashes
+    (the edited ones) are extracted; extraction is the expensive part and stays
+    O(new or changed messages). The hash set is capped so the persisted state stays O(1)
+    per turn; a resent text that has aged out is only extracted again after a rescan
+    (merging intelligence is idempotent).
+
+    Nothing is marked analyzed until the caller persists the returned state, which it
+    does only after the backlog has actually been extracted.
+    """
+
+    EMPTY_PREFIX = hashlib.sha1().hexdigest()[:16]
+
+    @staticmethod
+    def entry_hash(sender: str, text: str) -> str:
+        normalized = " ".join(text.lower().split())
+        return hashlib.sha1(f"{sender}\x00{normalized}".encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _unpack(entry: Any) -> Tuple[str, str]:
+        # Handle Permissive Types (Dict or Object), same as ChatAgent
+        if isinstance(entry, dict):
+            return entry.get("sender", "user"), entry.get("text", "") or ""
+        return getattr(entry, "sender", "user"), getattr(entry, "text", "") or ""
+
+    def plan(self, session: Dict[str, Any], history: List[Any], current_text: str, current_sender: str = "scammer") -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Returns (backlog_texts, state): scammer texts from history that still need
+        extraction, and the session fields to persist once extraction has run.
+        The current message is included in the state too, so it's skipped when it
+        shows up in next turn's history. The session itself is not modified.
+        """
+        watermark = session.get("history_watermark", 0)
+        analyzed = dict(session.get("analyzed_hashes") or {}) # Bounded by HISTORY_HASH_LIMIT
+        turn = session.get("message_count", 0)
+
+        # Chained over every entry, so an edit anywhere below the watermark changes it
+        chain = hashlib.sha1()
+        for i, entry in enumerate(history):
+            if i == watermark:
+                break
+            chain.update(self.entry_hash(*self._unpack(entry)).encode("ascii"))
+        unchanged = watermark <= len(history) and chain.hexdigest()[:16] == session.get("history_prefix_hash", self.EMPTY_PREFIX)
+        start = watermark if unchanged else 0
+        for entry in history[watermark:]:
+            chain.update(self.entry_hash(*self._unpack(entry)).encode("ascii"))
+
+        # The current text is extracted by the main pipeline; count it first so it isn't done twice
+        if current_text:
+            analyzed.setdefault(self.entry_hash(current_sender, current_text), turn)
+
+        backlog = []
+        for entry in history[start:]:
+            sender, text = self._unpack(entry)
+            if sender != "scammer" or not text.strip():
+                continue
+            h = self.entry_hash(sender, text)
+            if h not in analyzed:
+                analyzed[h] = turn
+                backlog.append(text)
+
+        # Dicts keep insertion order, so the oldest hashes go first
+        for h in list(analyzed)[:max(0, len(analyzed) - settings.HISTORY_HASH_LIMIT)]:
+            del analyzed[h]
+
+        state = {
+            "history_watermark": len(history),
+            "history_prefix_hash": chain.hexdigest()[:16],
+            "analyzed_hashes": analyzed
+        }
+        return backlog, state
+
+history_tracker = HistoryTracker()
@@ -1,16 +1,21 @@
-import re
 import json
 import logging
 from typing import Dict, List
-from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.llm import chat_completion
+from app.services.result_cache import ResultCache
+from app.services.llm_router import llm_router
+from app.services.regex_extractor import regex_extractor
+from app.services.ner import ner_service
+from app.services.llm_guard import UpstreamUnavailable
 
 class IntelligenceExtractor:
+    FIELDS = [
+        "upi_ids", "urls", "phone_numbers", "account_numbers", "ifsc_codes",
+        "bank_names", "crypto_wallets", "person_names", "entities"
+    ]
+
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=settings.LLM_API_KEY,
-            base_url=settings.LLM_BASE_URL
-        )
         self.system_prompt = (
             "You are an expert Intelligence Extraction AI. "
             "Identify and extract PROPER NOUNS and FINANCIAL DETAILS from the message. "
@@ -26,56 +31,85 @@ class IntelligenceExtractor:
             "9. 'entities': Any other proper nouns (Locations, Companies). "
             "Do NOT extract generic words (money, help, call)."
         )
+        self.cache = ResultCache(
+            "intel", settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL, settings.RESULT_CACHE_DIR
+        )
 
-    async def extract(self, text: str) -> Dict[str, List[str]]:
+    def regex_extract(self, text: str) -> Dict[str, List[str]]:
         # Initialize with all keys
-        extracted = {
-            "upi_ids": [],
-            "urls": [],
-            "phone_numbers": [],
-            "account_numbers": [],
-            "ifsc_codes": [],
-            "bank_names": [],
-            "crypto_wallets": [],
-            "person_names": [],
-            "entities": []
-        }
+        extracted = {key: [] for key in self.FIELDS}
         
-        # 1. Regex (Only for strict technical formats like UPI/URL/Phone)
-        # UPI
-        extracted["upi_ids"] = re.findall(r"[\w\.\-_]+@[\w]+", text)
-        # URL
-        extracted["urls"] = re.findall(r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+", text)
+        # 1. Local validated patterns for every technical field (UPI/URL/phone/account/IFSC/wallets/banks)
+        extracted.update(regex_extractor.extract(text))
+        return extracted
+
+    def merge_llm_fields(self, extracted: Dict[str, List[str]], data: Dict) -> Dict[str, List[str]]:
+        """Merge an LLM JSON answer into `extracted` and deduplicate every field."""
+        # We iterate over the keys we expect
+        for key in extracted.keys():
+            if key in data and isinstance(data[key], list):
+                # Filter for strings only to avoid TypeError
+                items = [str(x) for x in data[key] if isinstance(x, (str, int, float))]
+                validate = regex_extractor.validator(key)
+                if validate:
+                    # Technical fields must pass the same validators as local matches
+                    # (drops things like "Your account number" and normalizes formats)
+                    items = [v for item in items for v in validate(item)]
+                extracted[key].extend(items)
+
+        # Deduplicate all lists
+        for k in extracted:
+            extracted[k] = list(set(extracted[k]))
+        return extracted
+
+    def combine(self, *results: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Union several extraction results field by field."""
+        combined = {key: set() for key in self.FIELDS}
+        for result in results:
+            for key, values in result.items():
+                combined.setdefault(key, set()).update(values)
+        return {key: list(values) for key, values in combined.items()}
+
+    async def extract(self, text: str) -> Dict[str, List[str]]:
+        extracted = self.regex_extract(text)
+        data = {}
+        if ner_service.enabled:
+            # Fully local: validated patterns for technical fields + spaCy for names/banks/entities
+            try:
+                return self.merge_llm_fields(extracted, await ner_service.extract(text))
+            except Exception as e:
+                logging.error(f"Local NER failed, falling back: {e}")
+        if settings.INTEL_EXTRACTION_MODE == "regex_only":
+            # High-volume mode: no upstream call, names/entities come only from the bank list
+            return self.merge_llm_fields(extracted, data)
         
         # 2. LLM Extraction (Dynamic & Comprehensive)
         try:
-            # Dynamic Prompt for Structured Data
-            response = await self.client.chat.completions.create(
-                model=settings.LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": text}
-                ],
-                max_tokens=200,
-                temperature=0.0,
-                response_format={"type": "json_object"}
-            )
-            data = json.loads(response.choices[0].message.content)
-            
-            # Merge JSON results into extracted dict
-            # We iterate over the keys we expect
-            for key in extracted.keys():
-                if key in data:
-                    # Filter for strings only to avoid TypeError
-                    items = [str(x) for x in data[key] if isinstance(x, (str, int, float))]
-                    extracted[key].extend(items)
-            
+            if settings.RESULT_CACHE_ENABLED:
+                key = ResultCache.make_key(text, llm_router.cache_namespace("intel"))
+                data = await self.cache.get_or_compute(key, lambda: self._llm_fields(text))
+            else:
+                data = await self._llm_fields(text)
+        except UpstreamUnavailable:
+            pass # Shedding load: the validated local patterns are the answer
         except Exception as e:
             logging.error(f"LLM Extraction failed: {e}")
                  
-        # Deduplicate all lists
-        for k in extracted:
-            extracted[k] = list(set(extracted[k]))
-            
-        return extracted
+        return self.merge_llm_fields(extracted, data)
+
+    async def _llm_fields(self, text: str) -> Dict:
+        # Dynamic Prompt for Structured Data
+        response = await chat_completion(
+            "intel",
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": text}
+            ],
+            max_tokens=200,
+            temperature=0.0,
+            timeout=settings.INTEL_TIMEOUT_MS / 1000.0,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
+
 intelligence_extractor = IntelligenceExtractor()
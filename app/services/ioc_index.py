@@ -0,0 +1,195 @@
+import bisect
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Session intelligence field -> indicator kind. URLs are also indexed by domain.
+IOC_FIELDS = {
+    "upi_ids": "upi",
+    "phone_numbers": "phone",
+    "urls": "url",
+    "account_numbers": "account",
+    "ifsc_codes": "ifsc",
+    "crypto_wallets": "wallet",
+}
+KINDS = ("upi", "phone", "url", "domain", "account", "ifsc", "wallet")
+SEARCH_MODES = ("exact", "prefix", "domain")
+
+# (kind, normalized value)
+IOC = Tuple[str, str]
+# session_id -> (first_seen, last_seen)
+Postings = Dict[str, Tuple[float, float]]
+
+
+def _digits(value: str) -> str:
+    return "".join(ch for ch in value if ch.isdigit())
+
+
+def _reverse_labels(domain: str) -> str:
+    # Domains are kept label-reversed ("in.sbi-kyc.verify") so subdomains share a prefix
+    return ".".join(reversed(domain.split(".")))
+
+
+def domain_of(url: str) -> str:
+    try:
+        host = urlsplit(url if "://" in url else f"http://{url}").hostname or ""
+    except ValueError:
+        return ""
+    host = host.lower().strip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize(kind: str, value: str) -> str:
+    """Canonical form used as the index key, so '+91 98765-43210' and '9876543210' meet."""
+    value = str(value).strip()
+    if kind == "phone":
+        digits = _digits(value)
+        if len(digits) == 12 and digits.startswith("91"):
+            return digits[2:]
+        if len(digits) == 11 and digits.startswith("0"):
+            return digits[1:]
+        return digits
+    if kind == "account":
+        return _digits(value)
+    if kind == "ifsc":
+        return value.upper()
+    if kind == "wallet":
+        # EVM addresses are case-insensitive; base58 / bech32 ones are not touched
+        return value.lower() if value.lower().startswith("0x") else value
+    if kind == "url":
+        return value.lower().rstrip("/")
+    if kind == "domain":
+        return _reverse_labels(domain_of(value))
+    return value.lower()
+
+
+def display(kind: str, value: str) -> str:
+    return _reverse_labels(value) if kind == "domain" else value
+
+
+def extract(intelligence: Dict[str, list]) -> List[IOC]:
+    """Normalized indicators in one turn's (or session's) intelligence dict."""
+    iocs = set()
+    for field, kind in IOC_FIELDS.items():
+        for value in intelligence.get(field) or ():
+            key = normalize(kind, value)
+            if key:
+                iocs.add((kind, key))
+            if kind == "url":
+                domain = normalize("domain", value)
+                if domain:
+                    iocs.add(("domain", domain))
+    return list(iocs)
+
+
+class IOCIndex:
+    """
+    Cross-session inverted index: normalized indicator -> sessions that saw it, with
+    first/last-seen times. Backends implement exact lookup and sorted prefix scans;
+    search() builds the three query modes on top:
+
+      - exact:  normalized value, O(1) per kind
+      - prefix: values starting with the (normalized) query, e.g. a phone number prefix
+                or "https://sbi-" for URLs
+      - domain: a domain and all its subdomains (URLs are indexed by domain too)
+    """
+
+    def lookup(self, kind: str, value: str) -> Postings:
+        raise NotImplementedError
+
+    def scan(self, kind: str, prefix: str, limit: int) -> List[Tuple[str, Postings]]:
+        """Up to `limit` (value, postings) with value >= prefix and starting with it, in value order."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _prefix_key(kind: str, query: str) -> str:
+        if kind in ("phone", "account"):
+            return _digits(query) # Partial numbers: no country-code handling
+        return normalize(kind, query)
+
+    def search(self, query: str, kind: Optional[str] = None, mode: str = "exact", limit: int = 50) -> List[Dict[str, Any]]:
+        if kind == "domain" and mode == "prefix":
+            mode = "domain" # Domains are stored label-reversed, so "prefix" means the domain subtree
+        if mode == "domain":
+            kinds = ["domain"]
+        elif kind:
+            kinds = [kind]
+        else:
+            kinds = [k for k in KINDS if mode == "exact" or k != "domain"]
+        hits: List[Tuple[str, str, Postings]] = []
+        for k in kinds:
+            if len(hits) >= limit:
+                break
+            if mode == "prefix":
+                key = self._prefix_key(k, query)
+                if key:
+                    hits += [(k, value, postings) for value, postings in self.scan(k, key, limit - len(hits))]
+                continue
+            key = normalize(k, query)
+            if not key:
+                continue
+            postings = self.lookup(k, key)
+            if postings:
+                hits.append((k, key, postings))
+            if mode == "domain":
+                hits += [(k, value, postings) for value, postings in self.scan(k, key + ".", limit - len(hits))]
+        return [
+            {
+                "kind": k,
+                "value": display(k, value),
+                "sessions": [
+                    {"sessionId": sid, "firstSeen": first, "lastSeen": last}
+                    for sid, (first, last) in sorted(postings.items(), key=lambda item: -item[1][1])
+                ]
+            }
+            for k, value, postings in hits[:limit]
+        ]
+
+
+class MemoryIOCIndex(IOCIndex):
+    """
+    Dict postings plus a sorted value list per kind for prefix scans. Rebuilt from the
+    session records on startup (first/last seen then fall back to the session's
+    start_time/last_active) and trimmed as sessions expire.
+    """
+
+    def __init__(self):
+        self._postings: Dict[IOC, Dict[str, List[float]]] = {}
+        self._sorted: Dict[str, List[str]] = {kind: [] for kind in KINDS}
+        self._by_session: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def add(self, session_id: str, iocs: Iterable[IOC], seen_at: float, first_seen: Optional[float] = None):
+        for ioc in iocs:
+            sessions = self._postings.get(ioc)
+            if sessions is None:
+                sessions = self._postings[ioc] = {}
+                bisect.insort(self._sorted[ioc[0]], ioc[1])
+            entry = sessions.get(session_id)
+            if entry is None:
+                sessions[session_id] = [first_seen if first_seen is not None else seen_at, seen_at]
+                self._by_session.setdefault(session_id, set()).add(ioc)
+            elif seen_at > entry[1]:
+                entry[1] = seen_at
+
+    def forget(self, session_id: str):
+        for ioc in self._by_session.pop(session_id, ()):
+            sessions = self._postings[ioc]
+            sessions.pop(session_id, None)
+            if not sessions:
+                del self._postings[ioc]
+                values = self._sorted[ioc[0]]
+                del values[bisect.bisect_left(values, ioc[1])]
+
+    def lookup(self, kind: str, value: str) -> Postings:
+        return {sid: tuple(seen) for sid, seen in self._postings.get((kind, value), {}).items()}
+
+    def scan(self, kind: str, prefix: str, limit: int) -> List[Tuple[str, Postings]]:
+        values = self._sorted.get(kind, [])
+        found = []
+        for i in range(bisect.bisect_left(values, prefix), len(values)):
+            if len(found) >= limit or not values[i].startswith(prefix):
+                break
+            found.append((values[i], self.lookup(kind, values[i])))
+        return found
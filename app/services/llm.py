@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+import openai
+from app.core.clients import clients
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.llm_guard import UpstreamUnavailable, upstream_guard
+from app.services.llm_router import Endpoint, llm_router
+
+
+def _outcome(error: Exception) -> str:
+    # Only upstream-health problems count against the breaker; a bad request is our fault
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code == 429:
+            return "throttled"
+        return "failure" if error.status_code >= 500 else "client_error"
+    return "failure"
+
+
+async def chat_completion(service: str, **kwargs):
+    """
+    Every upstream chat completion goes through here, so latency, token usage and
+    errors are recorded per calling service and model in one place.
+    For stream=True the latency is time until the stream opens (no usage is reported).
+
+    The endpoint/model comes from the service's route (llm_router); if a candidate
+    fails or is shedding load the next one is tried. Each endpoint has its own circuit
+    breaker and adaptive concurrency limit; when every candidate is unhealthy this
+    raises UpstreamUnavailable immediately so callers fall back to their local answers
+    instead of queuing behind slow calls.
+    """
+    candidates = llm_router.candidates(service)
+    error = None
+    for i, endpoint in enumerate(candidates):
+        try:
+            return await _call(service, endpoint, kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+            if i + 1 < len(candidates) and not isinstance(e, UpstreamUnavailable):
+                logging.warning(f"LLM {service} call to {endpoint.name} failed ({type(e).__name__}), failing over")
+    raise error
+
+
+async def _call(service: str, endpoint: Endpoint, kwargs: dict):
+    model = endpoint.model
+    guard = upstream_guard.for_model(endpoint.name)
+    try:
+        admission = guard.admit()
+    except UpstreamUnavailable as e:
+        metrics.inc("honeypot_llm_shed_total", service=service, model=model, reason=e.reason)
+        raise
+
+    start = time.perf_counter()
+    outcome = "cancelled"
+    try:
+        client = clients.llm_for(endpoint.base_url, endpoint.api_key)
+        response = await client.chat.completions.create(**{**kwargs, "model": model})
+        outcome = "ok"
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        outcome = _outcome(e)
+        metrics.inc("honeypot_llm_errors_total", service=service, model=model, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        guard.done(admission, outcome, elapsed)
+        # Abandoned calls only tell us something about the endpoint if they were slow
+        if outcome != "cancelled" or elapsed * 1000 >= settings.LLM_SLOW_CALL_MS:
+            endpoint.record(outcome == "ok", elapsed * 1000)
+        metrics.observe("honeypot_llm_request_seconds", elapsed, service=service, model=model)
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.inc("honeypot_llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, service=service, model=model, kind="prompt")
+        metrics.inc("honeypot_llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, service=service, model=model, kind="completion")
+    return response
@@ -0,0 +1,193 @@
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream that is currently shedding load."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when, over the last LLM_BREAKER_WINDOW seconds (and at least
+    LLM_BREAKER_MIN_CALLS calls), the share of failed or slow calls reaches
+    LLM_BREAKER_FAILURE_RATIO. Open rejects everything for LLM_BREAKER_COOLDOWN, then
+    lets a single probe through (half-open): success closes it, failure re-opens.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, failure_ratio: float, min_calls: int, window: float, cooldown: float):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._calls = deque() # (timestamp, failed)
+        self._failures = 0
+
+    def allow(self, now: float) -> Optional[bool]:
+        """None: reject. True: allowed as the half-open probe. False: allowed normally."""
+        if self.state == self.CLOSED:
+            return False
+        if self.state == self.OPEN and now - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return None
+
+    def record(self, failed: bool, now: float, probe: bool = False):
+        if probe:
+            self._probe_in_flight = False
+            if failed:
+                self._open(now)
+            else:
+                self.state = self.CLOSED
+                self._calls.clear()
+                self._failures = 0
+            return
+        if self.state != self.CLOSED:
+            return # Late result of a call started before the breaker opened
+
+        self._calls.append((now, failed))
+        self._failures += failed
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._failures -= self._calls.popleft()[1]
+        if len(self._calls) >= self.min_calls and self._failures / len(self._calls) >= self.failure_ratio:
+            self._open(now)
+
+    def cancel_probe(self):
+        self._probe_in_flight = False
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self._calls.clear()
+        self._failures = 0
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by overload signals (slow calls, 429s): +1 after a
+    full limit's worth of healthy calls, x0.75 on overload. Only calls admitted after
+    the last decrease can trigger the next one, so a burst of calls that were all slow
+    together shrinks the limit once, not once per call. Calls over the limit are shed
+    immediately rather than queued.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._tickets = 0
+        self._decreased_at = 0
+
+    def try_acquire(self) -> Optional[int]:
+        """A ticket for release(), or None if the limit is reached."""
+        if self.in_flight >= int(self.limit):
+            return None
+        self.in_flight += 1
+        self._tickets += 1
+        return self._tickets
+
+    def release(self, ticket: int, overloaded: Optional[bool]):
+        """overloaded: True (slow/throttled), False (healthy), None (no signal, e.g. an error)."""
+        self.in_flight -= 1
+        if overloaded:
+            if ticket > self._decreased_at:
+                self.limit = max(self.minimum, self.limit * 0.75)
+                self._decreased_at = self._tickets
+        elif overloaded is False:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+
+class ModelGuard:
+    """Breaker + limiter for one upstream model."""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            settings.LLM_BREAKER_FAILURE_RATIO, settings.LLM_BREAKER_MIN_CALLS,
+            settings.LLM_BREAKER_WINDOW, settings.LLM_BREAKER_COOLDOWN
+        )
+        self.limiter = AdaptiveLimiter(
+            settings.LLM_CONCURRENCY_INITIAL, settings.LLM_CONCURRENCY_MIN, settings.LLM_CONCURRENCY_MAX
+        )
+        self.shed = {"circuit_open": 0, "concurrency": 0}
+
+    def admit(self) -> Optional[Tuple[int, bool]]:
+        """(limiter ticket, is half-open probe) for done(); raises UpstreamUnavailable to shed the call."""
+        if not settings.LLM_GUARD_ENABLED:
+            return None
+        probe = self.breaker.allow(time.monotonic())
+        if probe is None:
+            self.shed["circuit_open"] += 1
+            raise UpstreamUnavailable("circuit_open", "circuit open")
+        ticket = self.limiter.try_acquire()
+        if ticket is None:
+            if probe:
+                self.breaker.cancel_probe()
+            self.shed["concurrency"] += 1
+            raise UpstreamUnavailable("concurrency", f"concurrency limit {int(self.limiter.limit)} reached")
+        return ticket, probe
+
+    def done(self, admission: Optional[Tuple[int, bool]], outcome: str, elapsed: float):
+        """outcome: "ok", "failure", "throttled", "client_error" or "cancelled"."""
+        if admission is None:
+            return
+        ticket, probe = admission
+        slow = elapsed * 1000 >= settings.LLM_SLOW_CALL_MS
+        if outcome in ("ok", "failure", "throttled"):
+            failed = outcome != "ok" or slow
+        elif outcome == "cancelled" and slow:
+            failed = True # Abandoned by a stage timeout: the upstream is too slow
+        else:
+            failed = None
+
+        if failed is not None:
+            self.breaker.record(failed, time.monotonic(), probe)
+        elif probe:
+            self.breaker.cancel_probe() # No verdict; the next call probes instead
+
+        # The limiter only reacts to overload; hard errors are the breaker's job
+        if slow or outcome == "throttled":
+            overloaded = True
+        elif outcome == "ok":
+            overloaded = False
+        else:
+            overloaded = None
+        self.limiter.release(ticket, overloaded)
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.breaker.state,
+            "limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            **{f"shed_{reason}": count for reason, count in self.shed.items()}
+        }
+
+
+class UpstreamGuard:
+    """Per-upstream guards shared by every LLM-calling service (keyed on "model@base_url")."""
+
+    def __init__(self):
+        self._guards: Dict[str, ModelGuard] = {}
+
+    def for_model(self, model: str) -> ModelGuard:
+        guard = self._guards.get(model)
+        if guard is None:
+            guard = self._guards[model] = ModelGuard()
+        return guard
+
+    def stats(self) -> Dict[str, Dict]:
+        return {model: guard.stats() for model, guard in self._guards.items()}
+
+upstream_guard = UpstreamGuard()
@@ -0,0 +1,122 @@
+import time
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+# Calling service -> task whose route list it uses when it has none of its own
+TASKS = {
+    "chat": "chat",
+    "chat_summary": "chat",
+    "scam": "scam",
+    "scam_batch": "scam",
+    "fused": "scam",
+    "intel": "intel",
+}
+
+
+class Endpoint:
+    """One (base_url, model) an LLM task can be sent to, with its observed health."""
+
+    def __init__(self, model: str, base_url: str, api_key: str):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.name = f"{model}@{base_url}"
+        self.latency_ms: Optional[float] = None # EWMA over successful calls
+        self.error_rate = 0.0 # EWMA of failures (1) vs successes (0)
+        self.calls = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def record(self, ok: bool, latency_ms: float):
+        alpha = settings.LLM_ROUTE_EWMA_ALPHA
+        self.calls += 1
+        self.error_rate += alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.latency_ms = latency_ms if self.latency_ms is None else self.latency_ms + alpha * (latency_ms - self.latency_ms)
+        else:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+
+    def expected_ms(self, default_latency: float) -> float:
+        """Expected time per successful answer (EWMA latency inflated by the error rate)."""
+        latency = self.latency_ms if self.latency_ms is not None else default_latency
+        # Errors fade while an endpoint gets no traffic, so a failed one is eventually retried
+        idle = time.monotonic() - self.last_failure
+        error_rate = self.error_rate * 0.5 ** (idle / settings.LLM_ROUTE_ERROR_HALF_LIFE)
+        return latency / max(0.01, 1.0 - error_rate)
+
+    def stats(self) -> Dict:
+        return {
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "calls": self.calls,
+            "failures": self.failures
+        }
+
+
+class LLMRouter:
+    """
+    Per-task upstream selection. LLM_ROUTES maps a task ("chat", "scam", "intel") or a
+    specific service ("chat_summary", "fused", ...) to an ordered list of endpoints:
+
+        LLM_ROUTES='{"scam": [{"model": "llama-3.1-8b-instant"},
+                              {"model": "gpt-4o-mini", "base_url": "https://api.openai.com/v1", "api_key": "sk-..."}]}'
+
+    Missing base_url / api_key default to LLM_BASE_URL / LLM_API_KEY; a task without
+    routes uses LLM_MODEL. Candidates are tried best-first, ranked by EWMA latency
+    inflated by EWMA error rate, with later list positions penalized by
+    LLM_ROUTE_ORDER_PENALTY so the list order stays the preference when they're close.
+    A failed call moves on to the next candidate (failover).
+    """
+
+    def __init__(self):
+        self._endpoints: Dict[tuple, Endpoint] = {}
+        self._routes: Dict[str, List[Endpoint]] = {}
+
+    def _endpoint(self, model: str, base_url: str, api_key: str) -> Endpoint:
+        key = (model, base_url, api_key)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            # Shared between tasks, so health learned on one route benefits the others
+            endpoint = self._endpoints[key] = Endpoint(model, base_url, api_key)
+        return endpoint
+
+    def routes(self, service: str) -> List[Endpoint]:
+        route = self._routes.get(service)
+        if route is None:
+            specs = settings.LLM_ROUTES.get(service) or settings.LLM_ROUTES.get(TASKS.get(service, service)) or [{}]
+            route = self._routes[service] = [
+                self._endpoint(
+                    spec.get("model") or settings.LLM_MODEL,
+                    spec.get("base_url") or settings.LLM_BASE_URL,
+                    spec.get("api_key") or settings.LLM_API_KEY
+                )
+                for spec in specs
+            ]
+        return route
+
+    def cache_namespace(self, *services: str) -> str:
+        """
+        Result-cache namespace for answers from these services: the endpoints on their routes,
+        so changing LLM_ROUTES (or LLM_MODEL) stops serving answers cached from other models.
+        """
+        return "|".join(sorted({endpoint.name for service in services for endpoint in self.routes(service)}))
+
+    def candidates(self, service: str) -> List[Endpoint]:
+        route = self.routes(service)
+        if len(route) == 1:
+            return route
+        penalty = settings.LLM_ROUTE_ORDER_PENALTY
+        # Untried endpoints are assumed as fast as the fastest known one, so list order decides
+        known = [e.latency_ms for e in route if e.latency_ms is not None]
+        default_latency = min(known) if known else 1.0
+        ranked = sorted(
+            enumerate(route),
+            key=lambda item: (item[1].expected_ms(default_latency) * (1 + penalty * item[0]), item[0])
+        )
+        return [endpoint for _, endpoint in ranked]
+
+    def stats(self) -> Dict[str, Dict]:
+        return {endpoint.name: endpoint.stats() for endpoint in self._endpoints.values()}
+
+llm_router = LLMRouter()
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Cross-request micro-batching: items submitted by concurrent callers are collected for up
+    to `max_wait` seconds (or until `max_size` are waiting) and handed to `run_batch` as one
+    list. `run_batch` returns one result per item, in order; a result that is an exception
+    fails only that caller, and raising fails the whole batch.
+    """
+
+    def __init__(self, run_batch: Callable[[List[T]], Awaitable[List[Any]]], max_size: int, max_wait: float):
+        self.run_batch = run_batch
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only holds tasks weakly; an unreferenced batch could be collected mid-run
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]):
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue # Caller gave up (cancelled)
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
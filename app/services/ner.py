@@ -0,0 +1,101 @@
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.services.micro_batcher import MicroBatcher
+
+# --- Worker process side ---
+
+_nlp = None # Loaded once per worker process
+
+
+def _load_model(model_name: str):
+    global _nlp
+    if _nlp is None:
+        import spacy
+        # Only the NER component is needed; skipping the rest roughly halves per-doc cost
+        _nlp = spacy.load(model_name, exclude=["parser", "lemmatizer", "textcat"])
+    return _nlp
+
+
+def _ner_batch(model_name: str, texts: List[str]) -> List[Dict[str, List[str]]]:
+    from app.services.regex_extractor import regex_extractor
+    nlp = _load_model(model_name)
+    results = []
+    for doc in nlp.pipe(texts, batch_size=len(texts)):
+        found = {"person_names": [], "bank_names": [], "entities": []}
+        for ent in doc.ents:
+            value = ent.text.strip()
+            if not value:
+                continue
+            if ent.label_ == "PERSON":
+                found["person_names"].append(value)
+            elif ent.label_ == "ORG" and ("bank" in value.lower() or regex_extractor.is_bank_name(value)):
+                found["bank_names"].append(value)
+            elif ent.label_ in ("ORG", "GPE", "LOC", "FAC"):
+                found["entities"].append(value)
+        results.append(found)
+    return results
+
+
+# --- Event loop side ---
+
+class NERService:
+    """
+    Local named-entity recognition for person_names / bank_names / entities.
+
+    spaCy runs in a ProcessPoolExecutor so model inference never blocks the event loop.
+    Texts from concurrent requests are collected for up to NER_BATCH_WAIT_MS (or until
+    NER_BATCH_SIZE) and sent to a worker as one nlp.pipe batch.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._batcher = MicroBatcher(self._run_batch, settings.NER_BATCH_SIZE, settings.NER_BATCH_WAIT_MS / 1000.0)
+        self.available = importlib.util.find_spec("spacy") is not None
+        self.stats = {"batches": 0, "texts": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.NER_BACKEND == "spacy" and self.available
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that already runs writer threads isn't safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.NER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_model,
+                initargs=(settings.NER_MODEL,)
+            )
+        return self._pool
+
+    async def extract(self, text: str) -> Dict[str, List[str]]:
+        return await self._batcher.submit(text)
+
+    async def _run_batch(self, texts: List[str]) -> List[Dict[str, List[str]]]:
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._get_pool(), _ner_batch, settings.NER_MODEL, texts)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logging.error(f"NER batch failed: {e}")
+            if isinstance(e, (ImportError, OSError, BrokenProcessPool)):
+                # spaCy or the model isn't installed (or workers died loading it); stop routing traffic here
+                self.available = False
+                self.shutdown()
+            raise
+        self.stats["batches"] += 1
+        self.stats["texts"] += len(texts)
+        return results
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+ner_service = NERService()
@@ -0,0 +1,263 @@
+import hashlib
+import re
+from typing import Callable, Dict, List, Optional
+
+# --- Checksums ---
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BASE58_INDEX = {ch: i for i, ch in enumerate(BASE58_ALPHABET)}
+
+
+def base58check_decode(value: str) -> Optional[bytes]:
+    """Decode a Base58Check string; returns the payload (version byte included) or None."""
+    num = 0
+    for ch in value:
+        digit = BASE58_INDEX.get(ch)
+        if digit is None:
+            return None
+        num = num * 58 + digit
+    raw = num.to_bytes((num.bit_length() + 7) // 8, "big")
+    raw = b"\x00" * (len(value) - len(value.lstrip("1"))) + raw
+    if len(raw) < 5:
+        return None
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        return None
+    return payload
+
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+BECH32_CONSTS = (1, 0x2BC830A3) # bech32 (segwit v0), bech32m (v1+)
+
+
+def _bech32_polymod(values: List[int]) -> int:
+    generator = (0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3)
+    chk = 1
+    for v in values:
+        top = chk >> 25
+        chk = (chk & 0x1FFFFFF) << 5 ^ v
+        for i in range(5):
+            chk ^= generator[i] if ((top >> i) & 1) else 0
+    return chk
+
+
+def bech32_verify(value: str) -> bool:
+    if value.lower() != value and value.upper() != value:
+        return False
+    value = value.lower()
+    pos = value.rfind("1")
+    if pos < 1 or pos + 7 > len(value):
+        return False
+    hrp, data = value[:pos], value[pos + 1:]
+    if any(ch not in BECH32_CHARSET for ch in data):
+        return False
+    expanded = [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+    return _bech32_polymod(expanded + [BECH32_CHARSET.index(c) for c in data]) in BECH32_CONSTS
+
+
+# Keccak-256 (the pre-standard SHA-3 Ethereum uses; hashlib.sha3_256 pads differently)
+_KECCAK_RC = (
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+)
+# Rotation offsets indexed [x][y]
+_KECCAK_ROT = (
+    (0, 36, 3, 41, 18),
+    (1, 44, 10, 45, 2),
+    (62, 6, 43, 15, 61),
+    (28, 55, 25, 21, 56),
+    (27, 20, 39, 8, 14),
+)
+_MASK64 = (1 << 64) - 1
+
+
+def _rotl64(v: int, n: int) -> int:
+    return ((v << n) | (v >> (64 - n))) & _MASK64 if n else v
+
+
+def _keccak_f(a: List[int]):
+    for rc in _KECCAK_RC:
+        c = [a[x] ^ a[x + 5] ^ a[x + 10] ^ a[x + 15] ^ a[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rotl64(c[(x + 1) % 5], 1) for x in range(5)]
+        for i in range(25):
+            a[i] ^= d[i % 5]
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = _rotl64(a[x + 5 * y], _KECCAK_ROT[x][y])
+        for x in range(5):
+            for y in range(5):
+                a[x + 5 * y] = b[x + 5 * y] ^ (~b[(x + 1) % 5 + 5 * y] & b[(x + 2) % 5 + 5 * y])
+        a[0] ^= rc
+
+
+def keccak256(data: bytes) -> bytes:
+    rate = 136
+    padded = bytearray(data) + b"\x01" + b"\x00" * ((-len(data) - 1) % rate)
+    padded[-1] |= 0x80
+    state = [0] * 25
+    for offset in range(0, len(padded), rate):
+        block = padded[offset:offset + rate]
+        for i in range(rate // 8):
+            state[i] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        _keccak_f(state)
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+def eth_checksum_ok(address: str) -> bool:
+    """EIP-55: all-lower/all-upper addresses carry no checksum; mixed case must match."""
+    body = address[2:]
+    if body.lower() == body or body.upper() == body:
+        return True
+    digest = keccak256(body.lower().encode("ascii")).hex()
+    for ch, nibble in zip(body, digest):
+        if ch.isalpha() and ch.isupper() != (int(nibble, 16) >= 8):
+            return False
+    return True
+
+
+# --- Field validators ---
+
+def _valid_btc(value: str) -> bool:
+    if value.lower().startswith("bc1"):
+        return bech32_verify(value)
+    payload = base58check_decode(value)
+    return payload is not None and len(payload) == 21 and payload[0] in (0x00, 0x05)
+
+
+def _valid_tron(value: str) -> bool:
+    payload = base58check_decode(value)
+    return payload is not None and len(payload) == 21 and payload[0] == 0x41
+
+
+def _normalize_phone(raw: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", raw)
+    if raw.strip().startswith("+"):
+        # E.164: country code + subscriber number, 8-15 digits total
+        return "+" + digits if 8 <= len(digits) <= 15 else None
+    if len(digits) == 12 and digits.startswith("91"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    if len(digits) == 10 and digits[0] in "6789":
+        return "+91" + digits
+    return None
+
+
+def luhn_ok(digits: str) -> bool:
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch) * (2 if i % 2 else 1)
+        total += d - 9 if d > 9 else d
+    return total % 10 == 0
+
+
+def _card_like(digits: str) -> bool:
+    # 16-digit cards and 15-digit Amex (34/37) that pass Luhn are card numbers, not accounts
+    return (len(digits) == 16 or (len(digits) == 15 and digits[:2] in ("34", "37"))) and luhn_ok(digits)
+
+
+BANK_NAMES = (
+    "State Bank of India", "SBI", "HDFC", "ICICI", "Axis Bank", "Kotak", "Punjab National Bank", "PNB",
+    "Bank of Baroda", "Canara Bank", "Union Bank", "IndusInd", "Yes Bank", "IDFC", "Federal Bank",
+    "Bank of India", "Indian Bank", "Central Bank of India", "Paytm Payments Bank", "Airtel Payments Bank",
+    "RBL Bank", "Bandhan Bank", "Chase", "Citibank", "HSBC", "Barclays", "Wells Fargo", "Bank of America",
+)
+# Names that are ordinary words or short acronyms ("I will chase you", "an indian bank account"):
+# matched only with their exact capitalisation, or case-insensitively right before "bank" / "a/c" / "account"
+STRICT_BANK_NAMES = ("Chase", "SBI", "PNB", "HDFC", "IDFC", "HSBC", "Indian Bank", "Union Bank", "Yes Bank", "Federal Bank")
+
+
+class RegexExtractor:
+    """
+    Offline extraction of the technical intelligence fields. Every pattern is compiled
+    once at import and each candidate is validated (checksums, lengths, formats) so
+    the output can be trusted without an LLM pass.
+    """
+
+    URL = re.compile(r"\b(?:https?://|www\.)[^\s<>\"'()\[\]{}]+|\b(?:bit\.ly|tinyurl\.com|t\.me|wa\.me)/[^\s<>\"']+", re.IGNORECASE)
+    # Email-looking handles (dot in the domain part) are not UPI IDs
+    UPI = re.compile(r"(?<![\w.\-])([a-zA-Z0-9][a-zA-Z0-9.\-_]{1,255}@[a-zA-Z][a-zA-Z0-9]{1,63})(?![\w\-]|\.[a-zA-Z])")
+    PHONE = re.compile(r"(?<![\w+])(\+\d{1,3}[\s\-]?\(?\d{2,5}\)?(?:[\s\-]?\d{2,5}){1,4}|(?:0|91)?[\s\-]?[6-9]\d{4}[\s\-]?\d{5})(?![\w])")
+    IFSC = re.compile(r"\b([A-Za-z]{4}0[A-Za-z0-9]{6})\b")
+    ACCOUNT = re.compile(r"(?<![\w+\-])(\d{9,18}|\d{4}(?:[\s\-]\d{4}){2,3}(?:[\s\-]\d{1,4})?)(?![\w\-])")
+    BTC = re.compile(r"\b((?:bc1|BC1)[a-zA-HJ-NP-Z0-9]{11,87}|[13][a-km-zA-HJ-NP-Z1-9]{25,34})\b")
+    ETH = re.compile(r"\b(0x[a-fA-F0-9]{40})\b")
+    TRON = re.compile(r"\b(T[1-9A-HJ-NP-Za-km-z]{33})\b")
+    BANK = re.compile(r"\b(" + "|".join(
+        re.escape(b) for b in sorted(set(BANK_NAMES) - set(STRICT_BANK_NAMES), key=len, reverse=True)
+    ) + r")\b", re.IGNORECASE)
+    BANK_STRICT = re.compile(r"\b(" + "|".join(re.escape(b) for b in sorted(STRICT_BANK_NAMES, key=len, reverse=True)) + r")\b")
+    BANK_CONTEXT = re.compile(r"\b(" + "|".join(
+        re.escape(b) for b in STRICT_BANK_NAMES if "bank" not in b.lower()
+    ) + r")(?=\s*(?:bank|a/c|acc(?:oun)?t)\b)", re.IGNORECASE)
+    _BANK_CANONICAL = {b.lower(): b for b in BANK_NAMES}
+
+    FIELDS = ("upi_ids", "urls", "phone_numbers", "account_numbers", "ifsc_codes", "crypto_wallets", "bank_names")
+
+    def urls(self, text: str) -> List[str]:
+        return [m.group(0).rstrip(".,;:!?") for m in self.URL.finditer(text)]
+
+    def upi_ids(self, text: str) -> List[str]:
+        return self.UPI.findall(text)
+
+    def phone_numbers(self, text: str) -> List[str]:
+        found = []
+        for raw in self.PHONE.findall(text):
+            phone = _normalize_phone(raw)
+            if phone:
+                found.append(phone)
+        return found
+
+    def ifsc_codes(self, text: str) -> List[str]:
+        return [code.upper() for code in self.IFSC.findall(text)]
+
+    def account_numbers(self, text: str) -> List[str]:
+        found = []
+        for raw in self.ACCOUNT.findall(text):
+            digits = re.sub(r"\D", "", raw)
+            if not 9 <= len(digits) <= 18:
+                continue
+            # Bare Indian mobile numbers are phones, not accounts
+            if _normalize_phone(digits) and len(digits) in (10, 11, 12):
+                continue
+            if len(set(digits)) == 1 or _card_like(digits):
+                continue
+            found.append(digits)
+        return found
+
+    def crypto_wallets(self, text: str) -> List[str]:
+        found = [w for w in self.BTC.findall(text) if _valid_btc(w)]
+        found += [w for w in self.ETH.findall(text) if eth_checksum_ok(w)]
+        found += [w for w in self.TRON.findall(text) if _valid_tron(w)]
+        return found
+
+    def bank_names(self, text: str) -> List[str]:
+        # Drop links first so 'sbi-kyc-update.in' doesn't count as a mention of SBI
+        text = self.URL.sub(" ", text)
+        found = {}
+        for pattern in (self.BANK, self.BANK_STRICT, self.BANK_CONTEXT):
+            for m in pattern.finditer(text):
+                found.setdefault(m.start(), self._BANK_CANONICAL.get(m.group(1).lower(), m.group(1)))
+        return [found[start] for start in sorted(found)]
+
+    def is_bank_name(self, value: str) -> bool:
+        """Whole value is a known bank name, under the same case rules as bank_names()."""
+        value = value.strip()
+        return bool(self.BANK.fullmatch(value) or self.BANK_STRICT.fullmatch(value))
+
+    def extract(self, text: str) -> Dict[str, List[str]]:
+        return {field: list(dict.fromkeys(getattr(self, field)(text))) for field in self.FIELDS}
+
+    def validator(self, field: str) -> Optional[Callable[[str], List[str]]]:
+        """Per-field extractor used to vet values the LLM returned (None for free-text fields)."""
+        if field in self.FIELDS and field != "bank_names":
+            return getattr(self, field)
+        return None
+
+
+regex_extractor = RegexExtractor()
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+
+
+class RequestCoalescer:
+    """
+    Single-flight for retried requests. The first request for a key runs the computation
+    as its own task; identical requests arriving meanwhile await that same task, and ones
+    arriving up to `ttl` seconds after it finished get its stored response. Either way the
+    work (LLM calls, the message_count bump) happens once.
+
+    The task is shielded, so a leader whose client gave up doesn't cancel the work its
+    retries are waiting on. Failures and responses rejected by `cacheable` aren't replayed.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # key -> (expires_at, response)
+        self._completed: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"computed": 0, "coalesced": 0, "replayed": 0}
+
+    @staticmethod
+    def make_key(session_id: str, text: str, history_len: int, idempotency_key: Optional[str] = None) -> str:
+        # History length tells a retry (identical payload) from the scammer genuinely repeating a line
+        normalized = " ".join(text.lower().split())
+        raw = f"{session_id}\x00{normalized}\x00{history_len}\x00{idempotency_key or ''}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_completed(self, key: str) -> Optional[Any]:
+        entry = self._completed.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._completed[key]
+            return None
+        return value
+
+    def _settle(self, key: str, task: asyncio.Task, cacheable: Callable[[Any], bool]):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        if cacheable(value):
+            self._completed[key] = (time.monotonic() + self.ttl, value)
+            self._completed.move_to_end(key)
+            while len(self._completed) > self.max_entries:
+                self._completed.popitem(last=False)
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        completed = self._get_completed(key)
+        if completed is not None:
+            self.stats["replayed"] += 1
+            return completed
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["computed"] += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done, cacheable))
+        return await asyncio.shield(task)
+
+request_coalescer = RequestCoalescer(settings.MESSAGE_DEDUP_TTL, settings.MESSAGE_DEDUP_MAX_ENTRIES)
@@ -0,0 +1,106 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class ResultCache:
+    """
+    Bounded LRU + TTL cache for deterministic (temperature 0) LLM results.
+
+    Keys are a hash of the whitespace/case-folded text plus a namespace (the LLM endpoints that answer),
+    so a scam script pasted into hundreds of sessions is analyzed once. Concurrent misses
+    for the same key share a single upstream call (single-flight) that keeps running when the
+    caller that started it is cancelled. Failures are never cached.
+    """
+
+    def __init__(self, name: str, max_entries: int = 10000, ttl: float = 3600.0, persist_dir: Optional[str] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = os.path.join(persist_dir, f"{name}_cache.json") if persist_dir else None
+        # key -> (expires_at, value); wall-clock expiry so persisted entries survive restarts
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+        self.load()
+
+    @staticmethod
+    def make_key(text: str, namespace: str = "") -> str:
+        normalized = " ".join(text.lower().split())
+        return hashlib.sha256(f"{namespace}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.time() + self.ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _settle(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return # Failures are never cached (exception() also marks an unawaited one retrieved)
+        self.set(key, task.result())
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # Identical miss already on the wire; wait for its result instead of calling again
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        # The call runs as its own task and every caller (the first one included) waits through
+        # a shield, so one caller's stage timeout doesn't cancel the call the others are waiting on
+        return copy.deepcopy(await asyncio.shield(task))
+
+    # --- Persistence ---
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                raw = json.load(f)
+            now = time.time()
+            for key, (expires_at, value) in raw.items():
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            logging.info(f"Loaded {len(self._entries)} cached {self.name} results.")
+        except Exception as e:
+            logging.error(f"Failed to load {self.name} cache: {e}")
+
+    def save(self):
+        if not self.persist_path:
+            return
+        try:
+            tmp_path = self.persist_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({k: list(v) for k, v in self._entries.items()}, f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logging.error(f"Failed to save {self.name} cache: {e}")
@@ -1,20 +1,20 @@
 from app.core.config import settings
+from app.services.llm import chat_completion
+import asyncio
 import logging
-from openai import AsyncOpenAI
+from app.services.scam_prefilter import ScamPrefilter
+from app.services.result_cache import ResultCache
+from app.services.scam_batcher import ScamBatcher
+from app.services.llm_guard import UpstreamUnavailable
+from app.services.llm_router import llm_router
 import json
 
-# Basic scam phrases to compare against if model is not enough, 
-# or use zero-shot classification. For now, embedding similarity to known scam clusters makes sense,
-# but a fine-tuned classifier is better. 
-# For hackathon: Use Zero-Shot Classification or simple keyword + sentiment + specific known scam patterns.
-# BETTER APPROACH: Use a specialized classifier or simple heuristics with embeddings.
+# Tiers: local phrase rules (scam_prefilter) -> optional similarity to known scam/benign
+# messages (scam_index, hashed n-gram vectors) -> LLM for whatever is still ambiguous.
+# A fine-tuned classifier would be better still.
 
 class ScamDetector:
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=settings.LLM_API_KEY,
-            base_url=settings.LLM_BASE_URL
-        )
         self.system_prompt = (
             "You are a Scam Detection AI. Analyze the user's message. "
             "Determine if it has scam intent (phishing, financial fraud, urgency, asking for sensitive info). "
@@ -22,24 +22,143 @@ class ScamDetector:
             "'score' (float 0.0-1.0), 'scamDetected' (boolean), 'reason' (string). "
             "Example: {\"score\": 0.95, \"scamDetected\": true, \"reason\": \"Asked for bank details\"}."
         )
+        self.prefilter = ScamPrefilter(settings.SCAM_PREFILTER_HIGH, settings.SCAM_PREFILTER_LOW)
+        # How each prediction was answered
+        self.stats = {"local_scam": 0, "local_benign": 0, "index": 0, "llm": 0}
+        self.cache = ResultCache(
+            "scam", settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL, settings.RESULT_CACHE_DIR
+        )
+        self.batcher = ScamBatcher(self._classify)
+        self._index = None
+
+    @property
+    def short_circuited(self) -> int:
+        """Number of predictions answered locally without an LLM call."""
+        return self.stats["local_scam"] + self.stats["local_benign"] + self.stats["index"]
+
+    @property
+    def index(self):
+        """Nearest-neighbour index of reference messages, built on first use (needs numpy)."""
+        if self._index is None:
+            from app.services.scam_index import ScamIndex
+            self._index = ScamIndex(settings.SCAM_INDEX_DIM, settings.SCAM_INDEX_PATH, settings.SCAM_INDEX_MAX_SIZE)
+        return self._index
+
+    def local_verdict(self, text: str):
+        """Tier 1: local rules for obvious cases. None means the LLM has to decide."""
+        if not settings.SCAM_PREFILTER_ENABLED:
+            return None
+        local = self.prefilter.evaluate(text)
+        if local is not None:
+            self.stats["local_scam" if local["scamDetected"] else "local_benign"] += 1
+        return local
+
+    async def _on_index(self, fn, *args):
+        # Each lookup is a matrix product over every reference: inline while small, in a thread once it would stall the loop
+        if len(self.index) > settings.SCAM_INDEX_OFFLOAD_ABOVE:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def index_verdict(self, text: str):
+        """Tier 2: nearest known messages. None if nothing is close enough (or, when gating, they disagree)."""
+        if settings.SCAM_INDEX_MODE not in ("gate", "direct"):
+            return None
+        score, similarity = (await self._on_index(self.index.score, [text], settings.SCAM_INDEX_K))[0]
+        if similarity < settings.SCAM_INDEX_MIN_SIMILARITY:
+            return None
+        if settings.SCAM_INDEX_MODE == "gate" and 1.0 - settings.SCAM_INDEX_AGREEMENT < score < settings.SCAM_INDEX_AGREEMENT:
+            return None
+        self.stats["index"] += 1
+        return {
+            "score": round(score, 3),
+            "scamDetected": score >= settings.SCAM_SCORE_THRESHOLD,
+            "reason": f"Similar to known {'scam' if score >= 0.5 else 'benign'} messages (similarity {similarity:.2f})"
+        }
+
+    async def learn(self, text: str, result):
+        """Grow the index with messages the LLM confidently scored as scams (unless a near-duplicate is known)."""
+        if not settings.SCAM_INDEX_LEARN or settings.SCAM_INDEX_MODE == "off":
+            return
+        try:
+            confirmed = float(result.get("score", 0.0)) >= settings.SCAM_INDEX_LEARN_SCORE
+        except (TypeError, ValueError):
+            return
+        if confirmed:
+            try:
+                await self._on_index(self.index.add, [text], 1, settings.SCAM_INDEX_LEARN_MAX_SIMILARITY)
+            except Exception as e:
+                logging.error(f"Scam index update failed: {e}")
+
+    def save_index(self):
+        # No-op unless SCAM_INDEX_PATH is set and references were added
+        if self._index is not None:
+            self._index.save()
+
+    def cache_key(self, text: str) -> str:
+        # Batched answers come from the scam_batch route (or "scam" for single-message fallbacks)
+        services = ("scam", "scam_batch") if settings.SCAM_BATCHING else ("scam",)
+        return ResultCache.make_key(text, llm_router.cache_namespace(*services))
+
+    def heuristic(self, text: str, note: str = "LLM verdict pending"):
+        """Instant answer when the LLM result isn't ready: a cached LLM verdict, else the local rule score."""
+        if settings.RESULT_CACHE_ENABLED:
+            cached = self.cache.get(self.cache_key(text))
+            if cached is not None:
+                return cached
+        score, categories = self.prefilter.score(text)
+        return {
+            "score": round(score, 3),
+            "scamDetected": score >= settings.SCAM_SCORE_THRESHOLD,
+            "reason": f"Heuristic ({', '.join(categories) or 'no signals'}); {note}"
+        }
 
     async def predict(self, text: str):
+        local = self.local_verdict(text)
+        if local is not None:
+            return local
+
+        nearest = await self.index_verdict(text)
+        if nearest is not None:
+            return nearest
+        if settings.SCAM_INDEX_MODE == "direct":
+            # Network-free mode: nothing similar enough is known, so the rule score decides
+            return self.heuristic(text, "no similar known messages")
+
+        # Tier 3: LLM for everything ambiguous
+        self.stats["llm"] += 1
+        return await self._predict_llm(text)
+
+    async def _predict_llm(self, text: str):
+        # Opt-in: share one LLM call between concurrent requests
+        classify = self.batcher.classify if settings.SCAM_BATCHING else self._classify
         try:
-            response = await self.client.chat.completions.create(
-                model=settings.LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": text}
-                ],
-                max_tokens=100,
-                temperature=0.0,
-                response_format={"type": "json_object"}
-            )
-            content = response.choices[0].message.content
-            return json.loads(content)
+            if settings.RESULT_CACHE_ENABLED:
+                result = await self.cache.get_or_compute(self.cache_key(text), lambda: classify(text))
+            else:
+                result = await classify(text)
+            await self.learn(text, result)
+            return result
+        except UpstreamUnavailable:
+            # Upstream is shedding load: answer from local rules right away
+            return self.heuristic(text, "LLM unavailable")
         except Exception as e:
             logging.error(f"Scam Detection Error: {e}")
-            # Fail safe
+            # Fail safe (not cached)
             return {"score": 0.0, "scamDetected": False, "reason": "Error during analysis"}
 
+    async def _classify(self, text: str):
+        response = await chat_completion(
+            "scam",
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": text}
+            ],
+            max_tokens=100,
+            temperature=0.0,
+            timeout=settings.SCAM_TIMEOUT_MS / 1000.0,
+            response_format={"type": "json_object"}
+        )
+        content = response.choices[0].message.content
+        return json.loads(content)
+
 scam_detector = ScamDetector()
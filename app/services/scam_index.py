@@ -0,0 +1,256 @@
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Seed reference set: typical openers and asks from the scam families we see, plus
+# ordinary messages that share their vocabulary (banks, payments, deliveries).
+REFERENCE_SCRIPTS: Dict[str, List[str]] = {
+    "scam": [
+        "Your KYC is pending and your account will be blocked today, update it immediately.",
+        "Dear customer your SBI account has been suspended, click the link to verify your details.",
+        "I am calling from your bank head office, please share the OTP you just received.",
+        "Verify your account number and IFSC code now to avoid suspension.",
+        "We have a refund pending for your order, approve the collect request on your UPI app.",
+        "Enter your UPI PIN to receive the refund amount in your account.",
+        "Congratulations! You have won the KBC lottery prize of 25 lakh rupees.",
+        "Pay the processing fee of Rs 8500 to claim your prize money today.",
+        "Invest 10000 in our crypto trading plan and get guaranteed double returns in 7 days.",
+        "Send the USDT to this wallet address and your profit will be credited.",
+        "Part time job offer: earn 5000 daily by liking YouTube videos, pay registration fee to start.",
+        "Your electricity will be disconnected tonight at 9:30 pm, call the officer immediately.",
+        "This is customs, a parcel in your name contains illegal items, an arrest warrant is issued.",
+        "I am from the cyber crime cell, transfer your money to the safe RBI account for verification.",
+        "Your SIM card will be blocked in 2 hours, press 9 to talk to the TRAI officer.",
+        "Install AnyDesk so our support team can fix the issue in your net banking.",
+        "Your credit card reward points are expiring, share the card number and CVV to redeem.",
+        "Your FedEx courier is on hold, pay the clearance charges via this link.",
+        "Income tax refund approved, submit your bank details at this website to receive it.",
+        "Sir your loan is pre-approved, pay the insurance fee first to release the amount.",
+    ],
+    "benign": [
+        "Hello, who is this?",
+        "Hi, how are you doing today?",
+        "Sorry, I think you have the wrong number.",
+        "Can we meet for lunch tomorrow at 1?",
+        "I transferred the rent to your account this morning, please check.",
+        "Your order has been delivered. Thank you for shopping with us.",
+        "Reminder: your dentist appointment is on Monday at 10 am.",
+        "Did you get my message about the train tickets?",
+        "The bank is closed on Saturday, let's go on Monday instead.",
+        "Mom, I reached home safely.",
+        "Please send me the photos from the wedding.",
+        "The meeting has been moved to 3 pm, see you there.",
+        "Thanks for the payment, I received it.",
+        "Happy birthday! Have a great year ahead.",
+        "Can you pick up milk and bread on your way back?",
+    ],
+}
+
+LABELS = {"benign": 0, "scam": 1}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class HashedNGramVectorizer:
+    """
+    Stateless text -> vector mapping: character 3-5 grams of each word plus word
+    unigrams/bigrams, hashed (crc32, stable across processes) into `dim` buckets,
+    log-scaled and L2-normalized so a dot product is cosine similarity.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[int]:
+        words = _WORD.findall(text.lower())
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f" {w} "
+            for n in (3, 4, 5):
+                grams += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+        return [zlib.crc32(g.encode("utf-8")) % self.dim for g in grams]
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if features:
+                matrix[row] = np.log1p(np.bincount(features, minlength=self.dim))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class ScamIndex:
+    """
+    Local nearest-neighbour scorer over labeled reference messages (no network).
+
+    References are kept as one float32 matrix of normalized hashed n-gram vectors
+    (0/1 labels alongside). A saved index (`<path>.vectors.npy` / `<path>.labels.npy`)
+    is memory-mapped, so workers share the pages; references added at runtime go to an
+    in-memory tail and are folded into the files by save(). Lookups are batched: one
+    matrix product for all query texts, then top-k per row.
+
+    At most `max_size` references are kept. add() skips texts whose nearest reference is
+    already at least `max_similarity` close, so a script seen in many sessions is stored
+    once, also after a restart. search() may run in a worker thread while add() runs on
+    the event loop: it works on a snapshot of the arrays taken under a lock.
+    """
+
+    def __init__(self, dim: int, path: Optional[str] = None, max_size: int = 20000):
+        self.vectorizer = HashedNGramVectorizer(dim)
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._base_labels = np.zeros(0, dtype=np.int8)
+        # Runtime additions; capacity doubles so add() is amortized O(1)
+        self._extra = np.zeros((64, dim), dtype=np.float32)
+        self._extra_labels = np.zeros(64, dtype=np.int8)
+        self._extra_count = 0
+        self.stats = {"lookups": 0, "added": 0, "near_duplicates": 0, "full": 0}
+        if not (path and self.load(path)):
+            for name, texts in REFERENCE_SCRIPTS.items():
+                self.add(texts, LABELS[name])
+
+    def __len__(self) -> int:
+        return len(self._base_labels) + self._extra_count
+
+    @staticmethod
+    def _files(path: str) -> Tuple[str, str]:
+        return f"{path}.vectors.npy", f"{path}.labels.npy"
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Views of the filled rows: later add()/save() calls write new rows or swap arrays, never these
+        with self._lock:
+            count = self._extra_count
+            return self._base, self._base_labels, self._extra[:count], self._extra_labels[:count]
+
+    def _read(self, path: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        vectors_path, labels_path = self._files(path)
+        if not (os.path.exists(vectors_path) and os.path.exists(labels_path)):
+            return None
+        try:
+            base = np.load(vectors_path, mmap_mode="r")
+            labels = np.load(labels_path)
+        except Exception as e:
+            logging.error(f"Failed to load scam index from {path}: {e}")
+            return None
+        if base.ndim != 2 or base.shape[1] != self.vectorizer.dim or len(base) != len(labels):
+            logging.error(f"Scam index at {path} doesn't match SCAM_INDEX_DIM={self.vectorizer.dim}, ignoring it")
+            return None
+        return base, labels.astype(np.int8)
+
+    def load(self, path: str) -> bool:
+        loaded = self._read(path)
+        if loaded is None:
+            return False
+        with self._lock:
+            self._base, self._base_labels = loaded
+        logging.info(f"Loaded scam index with {len(self._base_labels)} references from {path}")
+        return True
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path or not self._extra_count:
+            return # Nothing new since load
+        base, base_labels, extra, extra_labels = self._snapshot()
+        vectors = np.concatenate([base, extra])
+        labels = np.concatenate([base_labels, extra_labels])
+        for target, array in zip(self._files(path), (vectors, labels)):
+            # Write-then-rename; a reader that still maps the old file keeps its pages
+            tmp = f"{target}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, target)
+        loaded = self._read(path)
+        if loaded is None:
+            return
+        with self._lock:
+            # Saved rows now come from the file; anything added meanwhile moves to a fresh tail
+            saved, count = len(extra_labels), self._extra_count
+            tail = self._extra[saved:count].copy()
+            tail_labels = self._extra_labels[saved:count].copy()
+            self._extra = np.zeros((max(64, 2 * len(tail)), self.vectorizer.dim), dtype=np.float32)
+            self._extra_labels = np.zeros(len(self._extra), dtype=np.int8)
+            self._extra[:len(tail)] = tail
+            self._extra_labels[:len(tail)] = tail_labels
+            self._extra_count = len(tail)
+            self._base, self._base_labels = loaded
+
+    def _nearest(self, vectors: np.ndarray) -> np.ndarray:
+        """Highest cosine similarity of each vector to any reference (0 for an empty index)."""
+        base, _, extra, _ = self._snapshot()
+        nearest = np.zeros(len(vectors), dtype=np.float32)
+        for matrix in (base, extra):
+            if len(matrix):
+                nearest = np.maximum(nearest, (vectors @ matrix.T).max(axis=1))
+        return nearest
+
+    def add(self, texts: List[str], label: int, max_similarity: float = 0.999) -> int:
+        """
+        Index new reference texts, skipping near-duplicates (of the index or of each other)
+        and anything beyond max_size; returns how many were added.
+        """
+        texts = [text for text in texts if text.strip()]
+        if not texts:
+            return 0
+        vectors = self.vectorizer.transform(texts)
+        nearest = self._nearest(vectors)
+        keep: List[int] = []
+        for i in range(len(texts)):
+            if nearest[i] >= max_similarity or (keep and (vectors[keep] @ vectors[i]).max() >= max_similarity):
+                self.stats["near_duplicates"] += 1
+            else:
+                keep.append(i)
+        with self._lock:
+            room = max(0, self.max_size - len(self))
+            if len(keep) > room:
+                self.stats["full"] += len(keep) - room
+                keep = keep[:room]
+            if not keep:
+                return 0
+            needed = self._extra_count + len(keep)
+            if needed > len(self._extra):
+                # New arrays (np.resize copies), so snapshots of the old ones stay valid
+                capacity = max(needed, 2 * len(self._extra))
+                self._extra = np.resize(self._extra, (capacity, self.vectorizer.dim))
+                self._extra_labels = np.resize(self._extra_labels, capacity)
+            self._extra[self._extra_count:needed] = vectors[keep]
+            self._extra_labels[self._extra_count:needed] = label
+            self._extra_count = needed
+        self.stats["added"] += len(keep)
+        return len(keep)
+
+    def search(self, texts: List[str], k: int) -> List[List[Tuple[float, int]]]:
+        """Top-k (cosine similarity, label) per text, most similar first."""
+        self.stats["lookups"] += len(texts)
+        base, base_labels, extra, extra_labels = self._snapshot()
+        if not (len(base_labels) + len(extra_labels)) or not texts:
+            return [[] for _ in texts]
+        queries = self.vectorizer.transform(texts)
+        similarities = np.concatenate([queries @ base.T, queries @ extra.T], axis=1)
+        labels = np.concatenate([base_labels, extra_labels])
+        k = min(k, similarities.shape[1])
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        results = []
+        for row, columns in enumerate(top):
+            ranked = sorted(columns, key=lambda c: -similarities[row, c])
+            results.append([(float(similarities[row, c]), int(labels[c])) for c in ranked])
+        return results
+
+    def score(self, texts: List[str], k: int) -> List[Tuple[float, float]]:
+        """(scam score, nearest similarity) per text: similarity-weighted vote of the top-k labels."""
+        scores = []
+        for neighbours in self.search(texts, k):
+            weight = sum(max(sim, 0.0) for sim, _ in neighbours)
+            if weight <= 0.0:
+                scores.append((0.0, 0.0))
+                continue
+            vote = sum(max(sim, 0.0) * label for sim, label in neighbours) / weight
+            scores.append((vote, neighbours[0][0]))
+        return scores
@@ -0,0 +1,181 @@
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Weighted scam signals. Weights are rough per-phrase likelihoods; the matcher combines
+# them noisy-OR style, so a few independent signals push the score toward 1.0.
+SIGNAL_PHRASES: Dict[str, Dict[str, float]] = {
+    "urgency": {
+        "immediately": 0.35, "urgent": 0.35, "urgently": 0.35, "right now": 0.3, "within 24 hours": 0.5,
+        "within 2 hours": 0.5, "today itself": 0.4, "last chance": 0.45, "act now": 0.45,
+        "as soon as possible": 0.25, "final warning": 0.55, "expires today": 0.45,
+    },
+    "threat": {
+        "will be blocked": 0.6, "will be suspended": 0.6, "account blocked": 0.55, "account suspended": 0.55,
+        "will be deactivated": 0.55, "legal action": 0.55, "arrest warrant": 0.65, "police case": 0.5,
+        "penalty": 0.3, "will be frozen": 0.6, "kyc expired": 0.6, "kyc pending": 0.55, "sim will be blocked": 0.6,
+    },
+    "credential": {
+        "otp": 0.6, "one time password": 0.6, "cvv": 0.65, "pin number": 0.55, "atm pin": 0.65,
+        "kyc": 0.4, "card number": 0.5, "password": 0.4, "verification code": 0.5, "share the code": 0.6,
+        "net banking": 0.35, "login details": 0.5, "aadhaar number": 0.45, "pan card": 0.35,
+        "account number": 0.35, "ifsc": 0.3,
+    },
+    "payment": {
+        "transfer money": 0.55, "send money": 0.45, "pay now": 0.5, "processing fee": 0.6,
+        "registration fee": 0.55, "refundable deposit": 0.6, "upi id": 0.4, "scan the qr": 0.5,
+        "gift card": 0.55, "bitcoin": 0.4, "crypto": 0.3, "wallet address": 0.45, "advance payment": 0.5,
+        "secure upi": 0.55, "safe account": 0.6, "anydesk": 0.7, "teamviewer": 0.6, "remote access": 0.55,
+    },
+    "reward": {
+        "you have won": 0.6, "lottery": 0.6, "prize": 0.4, "cashback": 0.35, "lucky draw": 0.6,
+        "claim your": 0.45, "free gift": 0.5, "work from home": 0.4, "earn daily": 0.5, "double your money": 0.7,
+        "guaranteed returns": 0.65, "part time job": 0.4,
+    },
+    "impersonation": {
+        "calling from the bank": 0.45, "calling from your bank": 0.5, "bank manager": 0.35, "customer care": 0.3,
+        "rbi": 0.35, "income tax department": 0.45, "cyber cell": 0.45, "customs": 0.35, "fedex": 0.35,
+        "courier": 0.25, "electricity bill": 0.4, "power will be cut": 0.6, "trai": 0.4,
+    },
+}
+
+# Messages made up only of these (greetings, "who is this", acknowledgements, forms of
+# address) are cleared locally. Lacking a scam keyword is not evidence on its own, so any
+# other message that isn't very short goes to the LLM.
+BENIGN_PHRASES = (
+    "hi", "hello", "hey", "hii", "good morning", "good afternoon", "good evening", "namaste", "namaskar",
+    "who is this", "who are you", "who is speaking", "who's this", "whos this", "who is calling",
+    "which company", "what is this about", "what is this regarding", "how did you get my number",
+    "wrong number", "ok", "okay", "yes", "no", "thanks", "thank you", "sorry", "i am busy", "call me later",
+    "sir", "madam", "ma'am", "ji", "bhai", "there", "please",
+)
+_BENIGN_PATTERN = re.compile(
+    r"(?:(?:" + "|".join(re.escape(p) for p in sorted(BENIGN_PHRASES, key=len, reverse=True)) + r")\b\s*)+"
+)
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+# Technical indicators that on their own are suspicious in an unsolicited message
+UPI_PATTERN = re.compile(r"\b[\w.\-]{2,}@[a-zA-Z]{2,}\b")
+URL_PATTERN = re.compile(r"https?://|www\.|bit\.ly|tinyurl", re.IGNORECASE)
+LONG_DIGITS_PATTERN = re.compile(r"\b\d{9,18}\b")
+PATTERN_SIGNALS = (
+    (UPI_PATTERN, "payment", 0.45),
+    (URL_PATTERN, "link", 0.35),
+    (LONG_DIGITS_PATTERN, "credential", 0.25),
+)
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over lower-cased text: all phrases are matched in a single
+    pass, O(len(text) + matches), regardless of how many phrases are registered.
+    Matches must sit on word boundaries so 'otp' doesn't fire inside 'hotpot'.
+    """
+
+    def __init__(self, phrases: Dict[str, Tuple[str, float]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str, float]]] = [[]]
+        for phrase, (category, weight) in phrases.items():
+            self._add(phrase.lower(), category, weight)
+        self._build()
+
+    def _add(self, phrase: str, category: str, weight: float):
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((phrase, category, weight))
+
+    def _build(self):
+        # BFS to compute failure links; outputs are merged so each state reports all suffix matches
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[str, str, float]]:
+        text = text.lower()
+        n = len(text)
+        node = 0
+        found = []
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for phrase, category, weight in self._out[node]:
+                start = i - len(phrase) + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (i + 1 == n or not text[i + 1].isalnum()):
+                    found.append((phrase, category, weight))
+        return found
+
+
+class ScamPrefilter:
+    """
+    Local first tier for ScamDetector. Returns a verdict for obviously scammy or obviously
+    harmless messages and None for anything in between (which goes to the LLM).
+    """
+
+    # Signal-free messages this short are cleared locally even when not on the allowlist
+    MAX_BENIGN_WORDS = 2
+
+    def __init__(self, high_threshold: float, low_threshold: float):
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.matcher = PhraseMatcher({
+            phrase: (category, weight)
+            for category, phrases in SIGNAL_PHRASES.items()
+            for phrase, weight in phrases.items()
+        })
+
+    def score(self, text: str) -> Tuple[float, List[str]]:
+        signals: Dict[str, float] = {}
+        categories = set()
+        for phrase, category, weight in self.matcher.find(text):
+            signals[phrase] = weight # Repeats of the same phrase count once
+            categories.add(category)
+        for pattern, category, weight in PATTERN_SIGNALS:
+            if pattern.search(text):
+                signals[f"<{category}>"] = weight
+                categories.add(category)
+
+        # Noisy-OR over individual signals
+        remaining = 1.0
+        for weight in signals.values():
+            remaining *= (1.0 - weight)
+        return 1.0 - remaining, sorted(categories)
+
+    def is_benign(self, text: str) -> bool:
+        """Very short, or nothing but allowlisted small talk ("Hello sir, who is this?")."""
+        if len(text.split()) <= self.MAX_BENIGN_WORDS:
+            return True
+        words = _PUNCTUATION.sub(" ", text.lower()).strip()
+        return bool(words) and _BENIGN_PATTERN.fullmatch(words) is not None
+
+    def evaluate(self, text: str) -> Optional[Dict]:
+        score, categories = self.score(text)
+        if score >= self.high_threshold:
+            return {
+                "score": round(score, 3),
+                "scamDetected": True,
+                "reason": f"Local rules matched: {', '.join(categories)}"
+            }
+        if score <= self.low_threshold and self.is_benign(text):
+            return {
+                "score": round(score, 3),
+                "scamDetected": False,
+                "reason": "Local rules: no scam signals"
+            }
+        return None
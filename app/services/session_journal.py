@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from app.services.session_record import json_default
+
+
+class SessionJournal:
+    """
+    Write-behind persistence for SessionManager.
+
+    Every change is appended to a journal file as one JSON line by a background
+    thread, so the request path only pays for serializing the session that changed.
+    The writer periodically folds everything into a compact snapshot and truncates
+    the journal. On startup, snapshot + journal are replayed to recover state.
+
+    Journal records:
+        {"op": "put", "id": "<session_id>", "data": {...}}
+        {"op": "del", "id": "<session_id>"}
+    """
+
+    _STOP = object()
+
+    def __init__(self, snapshot_path: str, journal_path: str, compact_every: int = 1000, compact_interval: float = 60.0):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot_fn: Optional[Callable[[], Dict[str, Any]]] = None
+        self._records_since_compact = 0
+        self._last_compact = time.time()
+
+    # --- Recovery ---
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Rebuild the session dict from the last snapshot plus the journal tail."""
+        sessions: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r") as f:
+                    sessions = json.load(f)
+            except Exception as e:
+                logging.error(f"Failed to load session snapshot: {e}")
+
+        if os.path.exists(self.journal_path):
+            replayed = 0
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write from a crash mid-append; everything before it is intact
+                        logging.warning("Skipping corrupt session journal line")
+                        continue
+                    if record.get("op") == "put":
+                        sessions[record["id"]] = record["data"]
+                    elif record.get("op") == "del":
+                        sessions.pop(record["id"], None)
+                    replayed += 1
+            self._records_since_compact = replayed
+            if replayed:
+                logging.info(f"Replayed {replayed} session journal records.")
+        return sessions
+
+    # --- Writer ---
+
+    def start(self, snapshot_fn: Callable[[], Dict[str, Any]]):
+        """Start the background writer. `snapshot_fn` returns the live session dict for compaction."""
+        if self._thread is not None:
+            return
+        self._snapshot_fn = snapshot_fn
+        self._thread = threading.Thread(target=self._run, name="session-journal", daemon=True)
+        self._thread.start()
+
+    def record_put(self, session_id: str, data: Dict[str, Any]):
+        # Serialize now so later mutations of the live dict can't race the writer thread
+        self._queue.put(json.dumps({"op": "put", "id": session_id, "data": data}, default=json_default))
+
+    def record_delete(self, session_id: str):
+        self._queue.put(json.dumps({"op": "del", "id": session_id}))
+
+    def close(self):
+        """Flush pending records, compact, and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                item = None
+
+            # Drain whatever else is queued so a burst becomes a single write
+            lines = []
+            while item is not None:
+                if item is self._STOP:
+                    stop = True
+                else:
+                    lines.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if lines:
+                self._append(lines)
+
+            due = (
+                self._records_since_compact >= self.compact_every
+                or (self._records_since_compact and time.time() - self._last_compact >= self.compact_interval)
+            )
+            if stop or due:
+                self._compact()
+
+    def _append(self, lines):
+        try:
+            with open(self.journal_path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._records_since_compact += len(lines)
+        except Exception as e:
+            logging.error(f"Failed to append session journal: {e}")
+
+    def _compact(self):
+        if self._snapshot_fn is None:
+            return
+        try:
+            # Top-level copy is atomic under the GIL; records queued after this point
+            # are written to the fresh journal and replay idempotently on top.
+            data = json.dumps(dict(self._snapshot_fn()), default=json_default)
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            open(self.journal_path, "w").close()
+            self._records_since_compact = 0
+            self._last_compact = time.time()
+        except Exception as e:
+            # Most likely a session mutated mid-serialization; retry on the next cycle
+            logging.error(f"Session journal compaction failed: {e}")
@@ -1,104 +1,96 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
+import asyncio
 import logging
+from app.core.config import settings
+from app.services.session_journal import SessionJournal
+from app.services.session_record import SessionRecord
+from app.services.session_store import SessionStore, MemorySessionStore, SQLiteSessionStore
 
 class SessionManager:
-    # In-memory storage with file persistence
-    _sessions: Dict[str, Dict[str, Any]] = {}
+    # Session state lives in a pluggable store (in-memory by default, SQLite for multi-worker)
     FILE_PATH = "sessions.json"
-    CLEANUP_INTERVAL = 10 # Cleanup every 10 updates (lightweight)
+    CLEANUP_INTERVAL = 30 # Seconds between background expiry sweeps
     SESSION_TTL = 3600 # 1 hour in seconds
-    _update_counter = 0
 
-    def __init__(self):
-        self._load_from_file()
+    def __init__(self, store: SessionStore = None):
+        self.store = store or self._build_store()
+
+    def _build_store(self) -> SessionStore:
+        if settings.SESSION_BACKEND == "sqlite":
+            logging.info(f"Using SQLite session store at {settings.SESSION_DB_PATH}")
+            return SQLiteSessionStore(settings.SESSION_DB_PATH)
+
+        journal = None
+        if settings.SESSION_PERSISTENCE == "journal":
+            journal = SessionJournal(
+                self.FILE_PATH,
+                settings.SESSION_JOURNAL_PATH,
+                compact_every=settings.SESSION_COMPACT_EVERY,
+                compact_interval=settings.SESSION_COMPACT_INTERVAL
+            )
+        return MemorySessionStore(self.FILE_PATH, journal)
 
     def _cleanup_old_sessions(self):
         import time
-        current_time = time.time()
-        keys_to_delete = []
-        
-        for sid, data in self._sessions.items():
-            last_active = data.get("last_active", 0)
-            if current_time - last_active > self.SESSION_TTL:
-                keys_to_delete.append(sid)
-        
-        if keys_to_delete:
-            logging.info(f"Cleaning up {len(keys_to_delete)} expired sessions.")
-            for key in keys_to_delete:
-                del self._sessions[key]
-            self._save_to_file()
-
-    def _load_from_file(self):
-        import json
-        import os
-        if os.path.exists(self.FILE_PATH):
+        expired = self.store.expire(time.time() - self.SESSION_TTL)
+        if expired:
+            logging.info(f"Cleaning up {len(expired)} expired sessions.")
+
+    async def run(self, method, *args):
+        """
+        Call a SessionManager method from async code. Blocking stores (SQLite) run in a
+        worker thread so a lock held by another process never stalls the event loop;
+        the in-memory store isn't thread-safe and is cheap, so it's called inline.
+        """
+        if self.store.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def run_cleanup_loop(self):
+        """Background expiry sweep, started from the app lifespan (keeps cleanup off the request path)."""
+        while True:
+            await asyncio.sleep(self.CLEANUP_INTERVAL)
             try:
-                with open(self.FILE_PATH, "r") as f:
-                    self._sessions = json.load(f)
+                await self.run(self._cleanup_old_sessions)
             except Exception as e:
-                logging.error(f"Failed to load sessions: {e}")
-
-    def _save_to_file(self):
-        import json
-        try:
-            with open(self.FILE_PATH, "w") as f:
-                json.dump(self._sessions, f, indent=2)
-        except Exception as e:
-            logging.error(f"Failed to save sessions: {e}")
+                logging.error(f"Session cleanup failed: {e}")
 
     def get_session(self, session_id: str) -> Dict[str, Any]:
         import time
-        
-        # Periodic cleanup check
-        self._update_counter += 1
-        if self._update_counter >= self.CLEANUP_INTERVAL:
-            self._cleanup_old_sessions()
-            self._update_counter = 0
-
-        if session_id not in self._sessions:
+
+        session = self.store.get(session_id)
+        if session is None:
             import random
             personas = ["elderly", "student", "busy_mom", "skeptic"]
             selected_persona = random.choice(personas)
-            
-            self._sessions[session_id] = {
-                "message_count": 0,
-                "persona": selected_persona,
-                "start_time": time.time(),
-                "last_active": time.time(),
-                "intelligence": {
-                    "upi_ids": [],
-                    "urls": [],
-                    "phone_numbers": [],
-                    "account_numbers": [],
-                    "ifsc_codes": [],
-                    "bank_names": [],
-                    "crypto_wallets": [],
-                    "person_names": [],
-                    "entities": []
-                }
-            }
+
+            # Intelligence fields are allocated as values arrive; every field still reads as present
+            now = time.time()
+            session = self.store.create(session_id, SessionRecord(0, selected_persona, now, now))
             # Log the selected persona for debugging/demo
-            logging.info(f"New session {session_id} assigned persona: {selected_persona}")
-            self._save_to_file()
-        
+            logging.info(f"New session {session_id} assigned persona: {session['persona']}")
+
         # Update last active
-        self._sessions[session_id]["last_active"] = time.time()
-        return self._sessions[session_id]
-
-    def update_session(self, session_id: str, intelligence_data: Dict[str, list]):
-        session = self.get_session(session_id)
-        session["message_count"] += 1
-        
-        # Merge intelligence dynamically
-        for key in intelligence_data:
-            # Initialize key if not exists (handling migration/schema changes)
-            if key not in session["intelligence"]:
-                session["intelligence"][key] = []
-            
-            current = set(session["intelligence"][key])
-            new_items = set(intelligence_data[key])
-            session["intelligence"][key] = list(current.union(new_items))
-        
-        self._save_to_file()
+        session["last_active"] = time.time()
+        self.store.touch(session_id, session["last_active"])
+        return session
+
+    def update_session(self, session_id: str, intelligence_data: Dict[str, list], fields: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Record one turn: bump message_count, merge intelligence, and set any extra session `fields`."""
+        import time
+        self.get_session(session_id)
+        return self.store.apply_update(session_id, intelligence_data, time.time(), fields)
+
+    def save_fields(self, session_id: str, fields: Dict[str, Any]):
+        """Set extra session fields outside a turn (e.g. from background jobs); a no-op if it expired meanwhile."""
+        self.store.set_fields(session_id, fields)
+
+    def search_iocs(self, query: str, kind: str = None, mode: str = "exact", limit: int = 50) -> List[Dict[str, Any]]:
+        """Sessions that saw an indicator (UPI id, phone, URL/domain, account, IFSC, wallet)."""
+        return self.store.iocs.search(query, kind, mode, limit)
+
+    def list_sessions(self) -> List[tuple]:
+        """(session_id, record) pairs for every live session."""
+        return list(self.store.items())
 
 session_manager = SessionManager()
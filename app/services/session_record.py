@@ -0,0 +1,186 @@
+import sys
+from types import MappingProxyType
+from typing import Any, Collection, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+INTELLIGENCE_FIELDS = (
+    "upi_ids", "urls", "phone_numbers", "account_numbers", "ifsc_codes",
+    "bank_names", "crypto_wallets", "person_names", "entities"
+)
+# Categorical values that repeat across many sessions; interned so they share one string object
+INTERNED_FIELDS = frozenset(("bank_names",))
+_FIELD_SLOTS = frozenset(INTELLIGENCE_FIELDS)
+
+# Fields with at most this many values are stored as tuples. A Python set preallocates
+# (216 bytes empty, 728 with 5 values), so a set per field would make records bigger;
+# small tuples are scanned in O(k) and only larger fields are promoted to sets.
+SMALL_FIELD = 8
+
+
+class SessionRecord:
+    """
+    Compact in-memory session: core fields and the nine intelligence fields are slots
+    (no per-instance __dict__), everything else (summary, history watermark, scam score,
+    ...) lives in a lazily created `extra` dict. Persona and bank names are interned.
+
+    Intelligence fields are None until they get a value, then a tuple, then a set once
+    they grow past SMALL_FIELD; merges update them in place instead of rebuilding every
+    list. Lists are only built by to_dict() when the record is serialized.
+
+    It keeps the mapping interface of the old plain-dict record, so callers still use
+    session["message_count"], .get(), .setdefault() and .update().
+    """
+
+    __slots__ = ("message_count", "persona", "start_time", "last_active", "_other_intel", "_extra") + INTELLIGENCE_FIELDS
+
+    CORE_FIELDS = ("message_count", "persona", "start_time", "last_active")
+
+    def __init__(self, message_count: int = 0, persona: Optional[str] = None, start_time: float = 0.0,
+                 last_active: float = 0.0, intelligence: Optional[Dict[str, Iterable[str]]] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.message_count = message_count
+        self.persona = sys.intern(persona) if persona else persona
+        self.start_time = start_time
+        self.last_active = last_active
+        for field in INTELLIGENCE_FIELDS:
+            setattr(self, field, None)
+        self._other_intel: Optional[Dict[str, Collection[str]]] = None # Fields outside INTELLIGENCE_FIELDS
+        self._extra: Optional[Dict[str, Any]] = None
+        if intelligence:
+            self.merge_intelligence(intelligence)
+        if extra:
+            self.update(extra)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionRecord":
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data.get("message_count", 0), data.get("persona"), data.get("start_time", 0.0), data.get("last_active", 0.0),
+            data.get("intelligence"),
+            {k: v for k, v in data.items() if k not in cls.CORE_FIELDS and k != "intelligence"}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain JSON-ready record in the original layout (every intelligence field as a list)."""
+        record = {
+            "message_count": self.message_count,
+            "persona": self.persona,
+            "start_time": self.start_time,
+            "last_active": self.last_active,
+            "intelligence": {field: list(values) for field, values in self.intelligence.items()}
+        }
+        if self._extra:
+            record.update(self._extra)
+        return record
+
+    # --- Intelligence ---
+
+    @property
+    def intelligence(self) -> Mapping[str, Collection[str]]:
+        """
+        Read-only snapshot: every field -> its values (tuple or set; an empty tuple for
+        fields with none yet). It is rebuilt on each access, so item assignment raises
+        instead of silently going nowhere; use merge_intelligence() or
+        session["intelligence"] = {...}.
+        """
+        view = {field: getattr(self, field) or () for field in INTELLIGENCE_FIELDS}
+        if self._other_intel:
+            view.update(self._other_intel)
+        return MappingProxyType(view)
+
+    def merge_intelligence(self, data: Dict[str, Iterable[str]]):
+        """Union new values into each field in place; untouched and empty fields allocate nothing."""
+        for field, values in data.items():
+            if not values:
+                continue
+            if field in INTERNED_FIELDS:
+                values = [sys.intern(v) for v in values]
+            slotted = field in _FIELD_SLOTS
+            current = getattr(self, field) if slotted else (self._other_intel or {}).get(field)
+            if isinstance(current, set):
+                current.update(values)
+                continue
+            current = current or ()
+            added = tuple(v for v in dict.fromkeys(values) if v not in current)
+            if not added:
+                continue
+            merged = current + added
+            if len(merged) > SMALL_FIELD:
+                merged = set(merged)
+            if slotted:
+                setattr(self, field, merged)
+            else:
+                if self._other_intel is None:
+                    self._other_intel = {}
+                self._other_intel[sys.intern(field)] = merged
+
+    # --- Mapping interface ---
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.CORE_FIELDS:
+            return getattr(self, key)
+        if key == "intelligence":
+            return self.intelligence
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: Any):
+        if key == "persona":
+            self.persona = sys.intern(value) if value else value
+        elif key in self.CORE_FIELDS:
+            setattr(self, key, value)
+        elif key == "intelligence":
+            for field in INTELLIGENCE_FIELDS:
+                setattr(self, field, None)
+            self._other_intel = None
+            self.merge_intelligence(value or {})
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[sys.intern(key)] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.CORE_FIELDS or key == "intelligence" or (self._extra is not None and key in self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.CORE_FIELDS
+        yield "intelligence"
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return len(self.CORE_FIELDS) + 1 + len(self._extra or ())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, fields: Dict[str, Any]):
+        for key, value in fields.items():
+            self[key] = value
+
+    def keys(self) -> Iterator[str]:
+        return iter(self)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((key, self[key]) for key in self)
+
+    def __repr__(self) -> str:
+        return f"SessionRecord({self.to_dict()!r})"
+
+
+def json_default(value: Any) -> Any:
+    """json.dump(default=...) hook: records and set-backed fields become plain JSON only when written."""
+    if isinstance(value, SessionRecord):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
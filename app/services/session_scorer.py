@@ -0,0 +1,98 @@
+import math
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+
+# Fail-safe answers (ScamDetector / FusedAnalyzer after an error) carry no evidence either way
+FAILSAFE_REASON = "Error during analysis"
+# Neither do stand-ins for a missing classification: the heuristic fallback (ScamDetector.heuristic,
+# used on timeouts) and the pre-filter's "nothing matched" answer, which only means no keyword hit
+NO_EVIDENCE_REASONS = (FAILSAFE_REASON, "Heuristic (", "Local rules: no scam signals")
+
+
+class SessionScorer:
+    """
+    Conversation-level scam verdict, updated incrementally from per-turn scores.
+
+    The session keeps a log-odds total (`scam_log_odds`), updated asymmetrically:
+      - a turn scored as scam-like (>= 0.5) adds logit(score) after the previous total is
+        multiplied by SCAM_SESSION_DECAY, so repeated evidence accumulates while old turns
+        slowly lose weight;
+      - a harmless-looking turn only adds SCAM_SESSION_BENIGN_WEIGHT * logit(score), without
+        decay. Most scammer follow-ups ("okay, tell me fast") are harmless on their own, so
+        they must not undo the pitch that came before them.
+    Fallback answers (NO_EVIDENCE_REASONS) aren't counted at all. `scam_score` is the
+    sigmoid of the total, stored next to message_count, and is what responses and
+    callbacks report.
+
+    Once a session is decided (score >= SCAM_SESSION_DECIDED after SCAM_SESSION_MIN_TURNS
+    scored turns) per-turn scoring is skipped, except every SCAM_SESSION_RECHECK_EVERY-th
+    message which is scored as usual so the verdict can still move.
+    """
+
+    # Caps how much evidence can pile up, so a long scam session can still be talked back down
+    MAX_LOG_ODDS = 12.0
+    # Floor for benign evidence (score ~0.27): a long harmless preamble mustn't mask the pitch that follows
+    MIN_LOG_ODDS = -1.0
+
+    def __init__(self):
+        self.stats = {"scored": 0, "skipped": 0, "rechecked": 0}
+
+    @staticmethod
+    def _logit(score: float) -> float:
+        p = min(0.99, max(0.01, score))
+        return math.log(p / (1.0 - p))
+
+    def decided(self, session: Dict[str, Any]) -> bool:
+        return (
+            session.get("scam_turns", 0) >= settings.SCAM_SESSION_MIN_TURNS
+            and session.get("scam_score", 0.0) >= settings.SCAM_SESSION_DECIDED
+        )
+
+    def should_score(self, session: Dict[str, Any]) -> bool:
+        """False when this turn can reuse the session verdict instead of being classified."""
+        if not self.decided(session):
+            self.stats["scored"] += 1
+            return True
+        every = settings.SCAM_SESSION_RECHECK_EVERY
+        if every > 0 and session.get("message_count", 0) % every == 0:
+            self.stats["rechecked"] += 1
+            return True
+        self.stats["skipped"] += 1
+        return False
+
+    def verdict(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """The stored session verdict in ScamDetector's result format."""
+        score = session.get("scam_score", 0.0)
+        return {
+            "score": round(score, 3),
+            "scamDetected": score >= settings.SCAM_SCORE_THRESHOLD,
+            "reason": f"Session verdict over {session.get('scam_turns', 0)} scored turns"
+        }
+
+    def update(self, session: Dict[str, Any], result: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        (session fields to persist, session verdict) after a turn with per-turn `result`.
+        Pass None for turns that reused the session verdict; they don't count as evidence.
+        """
+        if result is None or str(result.get("reason", "")).startswith(NO_EVIDENCE_REASONS):
+            return {}, self.verdict(session)
+        try:
+            score = float(result.get("score", 0.0))
+        except (TypeError, ValueError):
+            return {}, self.verdict(session)
+
+        previous = session.get("scam_log_odds", 0.0)
+        evidence = self._logit(score)
+        if evidence >= 0:
+            log_odds = settings.SCAM_SESSION_DECAY * previous + evidence
+        else:
+            log_odds = previous + settings.SCAM_SESSION_BENIGN_WEIGHT * evidence
+        log_odds = max(self.MIN_LOG_ODDS, min(self.MAX_LOG_ODDS, log_odds))
+        fields = {
+            "scam_log_odds": log_odds,
+            "scam_score": 1.0 / (1.0 + math.exp(-log_odds)),
+            "scam_turns": session.get("scam_turns", 0) + 1
+        }
+        return fields, self.verdict(fields)
+
+session_scorer = SessionScorer()
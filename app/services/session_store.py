@@ -0,0 +1,444 @@
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.ioc_index import IOCIndex, MemoryIOCIndex, extract as extract_iocs
+from app.services.session_journal import SessionJournal
+from app.services.session_record import SessionRecord, json_default
+
+
+class SessionStore:
+    """
+    Storage backend behind SessionManager.
+
+    A session record is a SessionRecord, a slotted mapping with the layout
+        {"message_count", "persona", "start_time", "last_active", "intelligence": {field: values}, ...}
+    Plain dicts in that layout are accepted too. Any extra keys are stored opaquely and
+    round-trip unchanged.
+
+    Each store also maintains `iocs`, a cross-session index of the indicators in
+    `intelligence` (see ioc_index.py), updated in create/apply_update and expire.
+
+    Stores with `blocking = True` do disk I/O and may wait on locks held by other
+    processes; SessionManager.run() calls them from a worker thread instead of on the
+    event loop.
+    """
+
+    iocs: IOCIndex
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def create(self, session_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert `record` unless the session already exists; return whichever record won."""
+        raise NotImplementedError
+
+    def touch(self, session_id: str, last_active: float):
+        raise NotImplementedError
+
+    def set_fields(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        """Atomically set only the given extra `fields`, leaving the rest of the record alone; False if gone."""
+        raise NotImplementedError
+
+    def apply_update(self, session_id: str, intelligence_data: Dict[str, list], last_active: float, fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Atomically bump message_count, union new intelligence values and set any extra `fields`."""
+        raise NotImplementedError
+
+    def expire(self, cutoff: float) -> List[str]:
+        """Delete sessions inactive since before `cutoff`; return their ids."""
+        raise NotImplementedError
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local dict, persisted to sessions.json either through the write-behind
+    journal or by full rewrites (SESSION_PERSISTENCE="snapshot").
+    """
+
+    def __init__(self, file_path: str, journal: Optional[SessionJournal] = None):
+        self.file_path = file_path
+        self._journal = journal
+        self._sessions: Dict[str, SessionRecord] = {}
+        # Expiry index: min-heap of (last_active, session_id), one live entry per session.
+        # Touches don't reorder the heap; stale entries are re-pushed lazily when popped.
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}
+        self.iocs = MemoryIOCIndex()
+        self._load_from_file()
+        self._rebuild_expiry_index()
+        self._rebuild_ioc_index()
+        if self._journal:
+            import atexit
+            self._journal.start(lambda: self._sessions)
+            atexit.register(self._journal.close)
+
+    # --- Persistence ---
+
+    def _load_from_file(self):
+        if self._journal:
+            # Snapshot + journal replay (crash recovery)
+            self._sessions = {sid: SessionRecord.from_dict(data) for sid, data in self._journal.load().items()}
+            return
+        if os.path.exists(self.file_path):
+            try:
+                with open(self.file_path, "r") as f:
+                    self._sessions = {sid: SessionRecord.from_dict(data) for sid, data in json.load(f).items()}
+            except Exception as e:
+                logging.error(f"Failed to load sessions: {e}")
+
+    def _save_to_file(self):
+        try:
+            with open(self.file_path, "w") as f:
+                json.dump(self._sessions, f, indent=2, default=json_default)
+        except Exception as e:
+            logging.error(f"Failed to save sessions: {e}")
+
+    def _persist(self, session_id: str):
+        """Persist a single session: journaled off the event loop, or a full rewrite in snapshot mode."""
+        if self._journal:
+            self._journal.record_put(session_id, self._sessions[session_id])
+        else:
+            self._save_to_file()
+
+    # --- Expiry index ---
+
+    def _rebuild_expiry_index(self):
+        self._scheduled = {sid: data.get("last_active", 0) for sid, data in self._sessions.items()}
+        self._expiry_heap = [(ts, sid) for sid, ts in self._scheduled.items()]
+        heapq.heapify(self._expiry_heap)
+
+    def _rebuild_ioc_index(self):
+        for sid, data in self._sessions.items():
+            iocs = extract_iocs(data.get("intelligence", {}))
+            self.iocs.add(sid, iocs, data.get("last_active", 0), first_seen=data.get("start_time"))
+
+    def _schedule_expiry(self, session_id: str, last_active: float):
+        self._scheduled[session_id] = last_active
+        heapq.heappush(self._expiry_heap, (last_active, session_id))
+
+    # --- SessionStore ---
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Returns the live record; changes go through set_fields()/apply_update() so they're persisted
+        return self._sessions.get(session_id)
+
+    def create(self, session_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        if session_id in self._sessions:
+            return self._sessions[session_id]
+        record = self._sessions[session_id] = SessionRecord.from_dict(record)
+        self._schedule_expiry(session_id, record["last_active"])
+        self.iocs.add(session_id, extract_iocs(record.get("intelligence", {})), record["last_active"])
+        self._persist(session_id)
+        return record
+
+    def touch(self, session_id: str, last_active: float):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session["last_active"] = last_active
+
+    def set_fields(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session.update(fields)
+        self._persist(session_id)
+        return True
+
+    def apply_update(self, session_id: str, intelligence_data: Dict[str, list], last_active: float, fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        session = self._sessions[session_id]
+        session.message_count += 1
+        session.last_active = last_active
+        if fields:
+            session.update(fields)
+
+        # Set-backed fields are unioned in place (unknown fields are added as they show up)
+        session.merge_intelligence(intelligence_data)
+        self.iocs.add(session_id, extract_iocs(intelligence_data), last_active)
+
+        self._persist(session_id)
+        return session
+
+    def expire(self, cutoff: float) -> List[str]:
+        keys_to_delete = []
+
+        # Only sessions whose *scheduled* time is past the cutoff are examined: O(expired * log n)
+        while self._expiry_heap and self._expiry_heap[0][0] < cutoff:
+            ts, sid = heapq.heappop(self._expiry_heap)
+            if self._scheduled.get(sid) != ts:
+                continue # Superseded entry (session deleted or re-scheduled)
+            data = self._sessions.get(sid)
+            if data is None:
+                self._scheduled.pop(sid, None)
+                continue
+            last_active = data.get("last_active", 0)
+            if last_active < cutoff:
+                keys_to_delete.append(sid)
+            else:
+                # Touched since it was scheduled; push back with its real deadline
+                self._schedule_expiry(sid, last_active)
+
+        for key in keys_to_delete:
+            del self._sessions[key]
+            self._scheduled.pop(key, None)
+            self.iocs.forget(key)
+            if self._journal:
+                self._journal.record_delete(key)
+        if keys_to_delete and not self._journal:
+            self._save_to_file()
+        return keys_to_delete
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return iter(list(self._sessions.items()))
+
+    def close(self):
+        if self._journal:
+            self._journal.close()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite (WAL mode) backend so several uvicorn workers on one box share sessions.
+
+    Core fields are columns (last_active is indexed for expiry sweeps), intelligence
+    values live in a child table keyed (session_id, field, value) so merges are plain
+    INSERT OR IGNOREs, and any other record keys go into a JSON `extra` column.
+    Normalized indicators go to an `iocs` table keyed (kind, value, session_id), written
+    in the same transaction and removed with the session by the cascade.
+    """
+
+    CORE_FIELDS = ("message_count", "persona", "start_time", "last_active", "intelligence")
+    # Another worker's write transaction can hold us for up to the busy timeout
+    blocking = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            persona TEXT,
+            start_time REAL,
+            last_active REAL NOT NULL,
+            extra TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active);
+        CREATE TABLE IF NOT EXISTS intelligence (
+            session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+            field TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (session_id, field, value)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS iocs (
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            PRIMARY KEY (kind, value, session_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_iocs_session ON iocs(session_id);
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # One connection per worker process; WAL lets readers and the single writer overlap.
+        # Thread-safe under self._lock, so calls can come from the default executor.
+        self._conn = sqlite3.connect(db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(self.SCHEMA)
+        self.iocs = SQLiteIOCIndex(self)
+        self._backfill_iocs()
+
+    def _backfill_iocs(self):
+        # Databases from before the IOC index: index their existing intelligence once
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM iocs LIMIT 1").fetchone():
+                return
+            rows = self._conn.execute(
+                "SELECT s.session_id, s.start_time, s.last_active, i.field, i.value "
+                "FROM sessions s JOIN intelligence i ON i.session_id = s.session_id"
+            ).fetchall()
+            sessions: Dict[str, Tuple[float, float, Dict[str, list]]] = {}
+            for sid, start_time, last_active, field, value in rows:
+                sessions.setdefault(sid, (start_time or last_active, last_active, {}))[2].setdefault(field, []).append(value)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sid, (first_seen, last_seen, intelligence) in sessions.items():
+                    self._insert_iocs(sid, intelligence, last_seen, first_seen)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _row_to_record(self, row, intel_rows) -> SessionRecord:
+        session_id, message_count, persona, start_time, last_active, extra = row
+        intelligence: Dict[str, List[str]] = {}
+        for field, value in intel_rows:
+            intelligence.setdefault(field, []).append(value)
+        # Empty fields have no rows; the record still reports the full key set
+        return SessionRecord(message_count, persona, start_time, last_active, intelligence, json.loads(extra) if extra else None)
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT session_id, message_count, persona, start_time, last_active, extra FROM sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        intel_rows = self._conn.execute(
+            "SELECT field, value FROM intelligence WHERE session_id = ?", (session_id,)
+        ).fetchall()
+        return self._row_to_record(row, intel_rows)
+
+    def _insert_intelligence(self, session_id: str, intelligence: Dict[str, list]):
+        rows = [(session_id, field, str(value)) for field, values in intelligence.items() for value in values]
+        if rows:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO intelligence (session_id, field, value) VALUES (?, ?, ?)", rows
+            )
+
+    def _insert_iocs(self, session_id: str, intelligence: Dict[str, list], seen_at: float, first_seen: Optional[float] = None):
+        rows = [(kind, value, session_id, first_seen or seen_at, seen_at) for kind, value in extract_iocs(intelligence)]
+        if rows:
+            self._conn.executemany(
+                "INSERT INTO iocs (kind, value, session_id, first_seen, last_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, value, session_id) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen)",
+                rows
+            )
+
+    def _insert(self, session_id: str, record: Dict[str, Any]):
+        extra = json.dumps({k: v for k, v in record.items() if k not in self.CORE_FIELDS})
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO sessions (session_id, message_count, persona, start_time, last_active, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, record.get("message_count", 0), record.get("persona"),
+             record.get("start_time"), record.get("last_active", 0), extra)
+        )
+        if cursor.rowcount:
+            self._insert_intelligence(session_id, record.get("intelligence", {}))
+            self._insert_iocs(session_id, record.get("intelligence", {}), record.get("last_active", 0))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load(session_id)
+
+    def create(self, session_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another worker may have created it first; its persona wins
+                self._insert(session_id, record)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._load(session_id)
+
+    def touch(self, session_id: str, last_active: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET last_active = ? WHERE session_id = ?", (last_active, session_id)
+            )
+
+    def _merge_extra(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        # Read-modify-write of the extra JSON; callers hold a BEGIN IMMEDIATE transaction
+        row = self._conn.execute("SELECT extra FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return False
+        extra = json.loads(row[0]) if row[0] else {}
+        extra.update({k: v for k, v in fields.items() if k not in self.CORE_FIELDS})
+        self._conn.execute(
+            "UPDATE sessions SET extra = ? WHERE session_id = ?", (json.dumps(extra), session_id)
+        )
+        return True
+
+    def set_fields(self, session_id: str, fields: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Only `fields` change: a turn committed by another worker keeps its count and fields
+                found = self._merge_extra(session_id, fields)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return found
+
+    def apply_update(self, session_id: str, intelligence_data: Dict[str, list], last_active: float, fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Increment in SQL so concurrent workers never lose a turn
+                self._conn.execute(
+                    "UPDATE sessions SET message_count = message_count + 1, last_active = ? WHERE session_id = ?",
+                    (last_active, session_id)
+                )
+                if fields:
+                    self._merge_extra(session_id, fields)
+                self._insert_intelligence(session_id, intelligence_data)
+                self._insert_iocs(session_id, intelligence_data, last_active)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._load(session_id)
+
+    def expire(self, cutoff: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "DELETE FROM sessions WHERE last_active < ? RETURNING session_id", (cutoff,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, message_count, persona, start_time, last_active, extra FROM sessions"
+            ).fetchall()
+            intel: Dict[str, List[Tuple[str, str]]] = {}
+            for sid, field, value in self._conn.execute("SELECT session_id, field, value FROM intelligence"):
+                intel.setdefault(sid, []).append((field, value))
+        return iter([(row[0], self._row_to_record(row, intel.get(row[0], []))) for row in rows])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteIOCIndex(IOCIndex):
+    """IOC queries against SQLiteSessionStore's `iocs` table (primary key order serves prefix scans)."""
+
+    def __init__(self, store: SQLiteSessionStore):
+        self._store = store
+
+    def lookup(self, kind: str, value: str) -> Dict[str, Tuple[float, float]]:
+        with self._store._lock:
+            rows = self._store._conn.execute(
+                "SELECT session_id, first_seen, last_seen FROM iocs WHERE kind = ? AND value = ?", (kind, value)
+            ).fetchall()
+        return {sid: (first, last) for sid, first, last in rows}
+
+    def scan(self, kind: str, prefix: str, limit: int) -> List[Tuple[str, Dict[str, Tuple[float, float]]]]:
+        with self._store._lock:
+            rows = self._store._conn.execute(
+                "SELECT value, session_id, first_seen, last_seen FROM iocs WHERE kind = ? AND value IN ("
+                "  SELECT DISTINCT value FROM iocs WHERE kind = ? AND value >= ? AND value < ? ORDER BY value LIMIT ?"
+                ") ORDER BY value",
+                (kind, kind, prefix, prefix + "\U0010ffff", limit)
+            ).fetchall()
+        found: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        for value, sid, first, last in rows:
+            found.setdefault(value, {})[sid] = (first, last)
+        return list(found.items())
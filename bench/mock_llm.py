@@ -0,0 +1,182 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API (plus the callback
+endpoint), so the honeypot can be load-tested without a real provider.
+
+    python -m bench.mock_llm --port 9100 --latency-ms 300 --jitter 0.5 --error-rate 0.01
+
+The reply is picked from the system prompt, so the detector, extractor, fused
+analyzer, batcher, summarizer and persona chat each get a plausible answer.
+GET /stats returns per-task call counts, POST /reset clears them.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.regex_extractor import regex_extractor
+
+app = FastAPI(title="Mock LLM")
+
+CONFIG = {
+    "latency_ms": 300.0, # Median upstream latency
+    "jitter": 0.5, # Lognormal sigma; 0 = fixed latency
+    "error_rate": 0.0, # Fraction of calls answered with a 500
+    "slow_rate": 0.0, # Fraction of calls that take slow_factor x longer (tail spikes)
+    "slow_factor": 10.0,
+}
+STATS = Counter()
+
+SCAM_WORDS = re.compile(r"\b(otp|kyc|blocked|suspend|verify|urgent|lottery|prize|refund|upi|transfer|pin|password|crypto|invest)\b", re.IGNORECASE)
+NAME = re.compile(r"\b(?:I am|I'm|this is|my name is)\s+([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)")
+REPLIES = [
+    "Oh dear, which account is this about?",
+    "Sorry, can you say that again slowly?",
+    "Okay, um, where do I find that number?",
+    "My grandson usually helps me with this, what do I press?",
+    "Is this going to cost me anything?",
+]
+
+
+def classify(text: str) -> dict:
+    hits = len(SCAM_WORDS.findall(text))
+    score = round(min(0.98, 0.15 + 0.2 * hits), 2)
+    return {"score": score, "scamDetected": score >= 0.7, "reason": f"{hits} scam signals (mock)"}
+
+
+def extract(text: str) -> dict:
+    found = regex_extractor.extract(text)
+    found["person_names"] = NAME.findall(text)
+    found["entities"] = []
+    return found
+
+
+def answer(system: str, user: str) -> str:
+    if "Intelligence Extraction" in system and "Scam Detection" in system:
+        STATS["fused"] += 1
+        return json.dumps({**classify(user), **extract(user)})
+    if '"results"' in system:
+        STATS["scam_batch"] += 1
+        # ScamBatcher sends the batch as a JSON array of {"id", "text"}
+        results = [{"id": item["id"], **classify(item["text"])} for item in json.loads(user)]
+        return json.dumps({"results": results})
+    if "Scam Detection" in system:
+        STATS["scam"] += 1
+        return json.dumps(classify(user))
+    if "Intelligence Extraction" in system:
+        STATS["intel"] += 1
+        return json.dumps(extract(user))
+    if "running notes" in system:
+        STATS["summary"] += 1
+        return "Caller claims to be from the bank and wants account details urgently."
+    STATS["chat"] += 1
+    return random.choice(REPLIES)
+
+
+def upstream_delay() -> float:
+    delay = CONFIG["latency_ms"] / 1000.0
+    if CONFIG["jitter"] > 0:
+        delay *= math.exp(random.gauss(0, CONFIG["jitter"]))
+    if random.random() < CONFIG["slow_rate"]:
+        delay *= CONFIG["slow_factor"]
+    return delay
+
+
+def completion(content: str, model: str, prompt_chars: int) -> dict:
+    return {
+        "id": f"mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4
+        }
+    }
+
+
+async def stream(content: str, model: str, delay: float):
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        await asyncio.sleep(delay / max(1, len(words)))
+        chunk = {
+            "id": "mock-stream", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    STATS["total"] += 1
+    messages = body.get("messages", [])
+    system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+    user = messages[-1]["content"] if messages else ""
+    model = body.get("model", "mock")
+    STATS[f"model:{model}"] += 1
+
+    delay = upstream_delay()
+    if random.random() < CONFIG["error_rate"]:
+        await asyncio.sleep(delay / 2)
+        STATS["errors"] += 1
+        return JSONResponse({"error": {"message": "mock upstream error", "type": "server_error"}}, status_code=500)
+
+    content = answer(system, user)
+    if body.get("stream"):
+        return StreamingResponse(stream(content, model, delay), media_type="text/event-stream")
+    await asyncio.sleep(delay)
+    return completion(content, model, sum(len(m.get("content", "")) for m in messages))
+
+
+@app.post("/callback")
+async def callback(request: Request):
+    await request.body()
+    STATS["callbacks"] += 1
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    return dict(STATS)
+
+
+@app.post("/reset")
+async def reset():
+    STATS.clear()
+    return {"status": "ok"}
+
+
+@app.post("/config")
+async def configure(request: Request):
+    CONFIG.update({k: float(v) for k, v in (await request.json()).items() if k in CONFIG})
+    return CONFIG
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible upstream for benchmarks")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter", type=float, default=CONFIG["jitter"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--slow-rate", type=float, default=CONFIG["slow_rate"])
+    parser.add_argument("--slow-factor", type=float, default=CONFIG["slow_factor"])
+    args = parser.parse_args()
+    CONFIG.update(latency_ms=args.latency_ms, jitter=args.jitter, error_rate=args.error_rate,
+                  slow_rate=args.slow_rate, slow_factor=args.slow_factor)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Benchmark harness: starts the mock LLM, then for each scenario starts the honeypot
+with that scenario's settings, replays scam scripts from many concurrent sessions
+against /message and reports latency percentiles, throughput and upstream calls.
+
+    python -m bench.run --sessions 100 --concurrency 50 --scenarios baseline,fused,regex_only
+    python -m bench.run --target http://localhost:8000 --mock-url http://127.0.0.1:9100
+
+Scenario settings are plain environment overrides for app.core.config.Settings.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.scripts import SCAM_SCRIPTS, BENIGN_SCRIPTS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_KEY = "bench-key"
+
+SCENARIOS: Dict[str, Dict[str, str]] = {
+    "baseline": {},
+    "no_cache": {"RESULT_CACHE_ENABLED": "false"},
+    "no_prefilter": {"SCAM_PREFILTER_ENABLED": "false"},
+    "fused": {"FUSED_ANALYSIS": "true"},
+    "regex_only": {"INTEL_EXTRACTION_MODE": "regex_only"},
+    "batching": {"SCAM_BATCHING": "true", "SCAM_PREFILTER_ENABLED": "false"},
+    "wait_all": {"EARLY_RESPONSE": "false"},
+    "hedged": {"CHAT_HEDGE_AFTER_MS": "600"},
+    "sqlite": {"SESSION_BACKEND": "sqlite"},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_process(args: List[str], env: Dict[str, str], cwd: str) -> subprocess.Popen:
+    full_env = {**os.environ, **env, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    return subprocess.Popen(args, env=full_env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_process(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# --- Load generator ---
+
+async def run_session(client: httpx.AsyncClient, base_url: str, script: List[str], latencies: List[float], errors: List[str], think: float):
+    session_id = f"bench-{uuid.uuid4().hex[:12]}"
+    history = []
+    for line in script:
+        payload = {
+            "sessionId": session_id,
+            "message": {"sender": "scammer", "text": line},
+            "conversationHistory": list(history),
+            "metadata": {"channel": "SMS"}
+        }
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{base_url}/message", json=payload, headers={"x-api-key": API_KEY})
+            elapsed = time.perf_counter() - start
+            body = response.json() if response.status_code == 200 else {}
+            if response.status_code != 200 or body.get("status") != "success":
+                errors.append(f"{response.status_code} {body.get('reply', response.text)[:80]}")
+            latencies.append(elapsed)
+            reply = body.get("reply", "")
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            latencies.append(time.perf_counter() - start)
+            reply = ""
+        history.append({"sender": "scammer", "text": line})
+        history.append({"sender": "user", "text": reply})
+        if think:
+            await asyncio.sleep(think)
+
+
+async def generate_load(base_url: str, sessions: int, concurrency: int, think_ms: float, benign_ratio: float) -> Dict:
+    scripts = list(SCAM_SCRIPTS.values())
+    benign = list(BENIGN_SCRIPTS.values())
+    benign_every = int(1 / benign_ratio) if benign_ratio > 0 else 0
+    scam_cycle, benign_cycle = itertools.cycle(scripts), itertools.cycle(benign)
+    plan = [next(benign_cycle) if benign_every and i % benign_every == 0 else next(scam_cycle) for i in range(sessions)]
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=60.0, limits=limits) as client:
+        async def one(script):
+            async with gate:
+                await run_session(client, base_url, script, latencies, errors, think_ms / 1000.0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(script) for script in plan])
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "wall_s": round(wall, 2),
+        "rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+    }
+
+
+def upstream_counts(mock_url: str, settle: float) -> Dict[str, int]:
+    # Background stages (late extraction, summaries, callbacks) keep calling upstream after the last response
+    time.sleep(settle)
+    return httpx.get(f"{mock_url}/stats").json()
+
+
+def run_scenario(name: str, overrides: Dict[str, str], mock_url: str, args) -> Dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+        env = {
+            "API_KEY": API_KEY,
+            "LLM_API_KEY": "mock",
+            "LLM_BASE_URL": f"{mock_url}/v1",
+            "CALLBACK_URL": f"{mock_url}/callback",
+            "CALLBACK_DEBOUNCE": "0.5",
+            **overrides,
+        }
+        # cwd is a scratch dir so sessions.json / *.db from the run don't leak into the repo
+        proc = start_process(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+            env, workdir
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            wait_ready(f"{base_url}/health")
+            httpx.post(f"{mock_url}/reset")
+            result = asyncio.run(generate_load(base_url, args.sessions, args.concurrency, args.think_ms, args.benign_ratio))
+            result["upstream"] = upstream_counts(mock_url, args.settle)
+        finally:
+            stop_process(proc)
+    result["scenario"] = name
+    return result
+
+
+def print_table(results: List[Dict]):
+    header = f"{'scenario':<14}{'reqs':>6}{'err':>5}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'llm calls':>11}{'calls/req':>11}{'callbacks':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        calls = r["upstream"].get("total", 0)
+        per_req = calls / r["requests"] if r["requests"] else 0
+        print(f"{r['scenario']:<14}{r['requests']:>6}{r['errors']:>5}{r['rps'] or 0:>8}{r['p50_ms'] or 0:>9}"
+              f"{r['p95_ms'] or 0:>9}{r['p99_ms'] or 0:>9}{calls:>11}{per_req:>11.2f}{r['upstream'].get('callbacks', 0):>11}")
+    print()
+    for r in results:
+        tasks = {k: v for k, v in r["upstream"].items() if k not in ("total", "callbacks") and not k.startswith("model:")}
+        print(f"{r['scenario']}: upstream by task {tasks}" + (f", sample errors {r['error_samples']}" if r["errors"] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Honeypot load test against a mock LLM upstream")
+    parser.add_argument("--scenarios", default="baseline,fused,regex_only", help=f"Comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--sessions", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=30, help="Sessions in flight at once")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between turns of one session")
+    parser.add_argument("--benign-ratio", type=float, default=0.1)
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait for background work before counting upstream calls")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock upstream median latency")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Mock upstream lognormal sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of upstream calls that are 10x slower")
+    parser.add_argument("--target", help="Drive an already running honeypot instead of starting one per scenario")
+    parser.add_argument("--mock-url", help="Use an already running mock (python -m bench.mock_llm)")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this file")
+    args = parser.parse_args()
+
+    mock_proc = None
+    mock_url = args.mock_url
+    if not mock_url:
+        mock_port = free_port()
+        mock_url = f"http://127.0.0.1:{mock_port}"
+        mock_proc = start_process(
+            [sys.executable, "-m", "bench.mock_llm", "--port", str(mock_port), "--latency-ms", str(args.latency_ms),
+             "--jitter", str(args.jitter), "--error-rate", str(args.error_rate), "--slow-rate", str(args.slow_rate)],
+            {}, ROOT
+        )
+    try:
+        wait_ready(f"{mock_url}/stats")
+        results = []
+        if args.target:
+            httpx.post(f"{mock_url}/reset")
+            result = asyncio.run(generate_load(args.target.rstrip("/"), args.sessions, args.concurrency, args.think_ms, args.benign_ratio))
+            result["upstream"] = upstream_counts(mock_url, args.settle)
+            result["scenario"] = "target"
+            results.append(result)
+        else:
+            for name in args.scenarios.split(","):
+                name = name.strip()
+                if name not in SCENARIOS:
+                    parser.error(f"unknown scenario {name!r}")
+                print(f"Running {name}...", flush=True)
+                results.append(run_scenario(name, SCENARIOS[name], mock_url, args))
+    finally:
+        if mock_proc is not None:
+            stop_process(mock_proc)
+
+    print()
+    print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
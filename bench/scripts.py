@@ -0,0 +1,66 @@
+"""Scammer-side scripts replayed by the load generator, one line per turn."""
+
+SCAM_SCRIPTS = {
+    "bank_kyc": [
+        "Hello, I am Rahul Sharma calling from SBI head office.",
+        "Your KYC is pending and your account will be blocked today.",
+        "To avoid suspension, verify your account number and IFSC code now.",
+        "Please send the details, for example 30414278901 with IFSC SBIN0001234.",
+        "Also share the OTP you just received on your phone.",
+        "This is urgent madam, the account will be frozen in 30 minutes.",
+        "You can also call our helpline +91 98765 43210 for verification.",
+        "Open https://sbi-kyc-update.in/verify and enter your details there.",
+    ],
+    "upi_refund": [
+        "Hi, this is Priya from Paytm customer care.",
+        "We have a refund of Rs 4,999 pending for your last order.",
+        "To receive it, please approve the collect request from refunds.desk@ybl.",
+        "Enter your UPI PIN to accept the refund, it is safe.",
+        "The request failed, please try again with paytm.refund@axl.",
+        "Hurry, the refund window expires in 10 minutes.",
+    ],
+    "lottery": [
+        "Congratulations! Your number won the KBC lottery prize of 25 lakh rupees.",
+        "I am Vijay Kumar, manager of the KBC prize department.",
+        "You only need to pay a processing fee of Rs 8,500 to claim the prize.",
+        "Transfer to account 918273645501 IFSC HDFC0004321, name Vijay Kumar.",
+        "Or pay quickly via UPI to kbc.prize@okhdfcbank.",
+        "Send the payment screenshot on WhatsApp to 9123456780.",
+    ],
+    "crypto_invest": [
+        "Hey! I'm Anna, a crypto trader. I doubled my money last month.",
+        "Our platform gives 5% daily returns, guaranteed.",
+        "Start with just $500, deposit to our BTC wallet 1BvBMSEYstWetqTFn5Au4m4GFg7xJaNVN2.",
+        "Or USDT on Tron: TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL.",
+        "Register at www.quickcoin-profits.com to track your earnings.",
+        "Withdrawals need a small verification fee first, it's standard.",
+    ],
+    "job_offer": [
+        "Hello, we found your profile for a part-time work from home job.",
+        "You can earn 3000 to 8000 daily by liking YouTube videos.",
+        "First task: pay a registration deposit of Rs 1,000 to unlock tasks.",
+        "Send to hr.tasks@ibl and share the transaction ID.",
+        "Join our Telegram group t.me/earn-daily-tasks for instructions.",
+    ],
+    "electricity": [
+        "Dear consumer, your electricity connection will be disconnected tonight at 9:30 pm.",
+        "Your last month bill was not updated. Please contact our officer immediately.",
+        "Call Mr. Sanjay Verma on 8800112233 to update the bill.",
+        "Download the AnyDesk app so our officer can help you pay.",
+        "Pay Rs 10 to verify via bit.ly/elec-bill-pay and enter card details.",
+    ],
+}
+
+# Non-scam traffic so the local tiers and benign paths get exercised too
+BENIGN_SCRIPTS = {
+    "wrong_number": [
+        "Hi, is this Meena? We met at the wedding last week.",
+        "Oh sorry, I think I have the wrong number.",
+        "No problem, have a nice day!",
+    ],
+    "delivery": [
+        "Hello, your parcel from Amazon is out for delivery.",
+        "Will someone be at home around 4 pm to receive it?",
+        "Okay, I will leave it with the security guard.",
+    ],
+}
@@ -0,0 +1,126 @@
+"""
+Session record benchmark: memory per session and per-turn intelligence merge cost for
+the legacy plain-dict record (nine lists, rebuilt through sets on every merge) versus
+SessionRecord (slots, interned categorical strings, in-place tuple/set merges).
+
+    python -m bench.session_bench --sessions 100000 --turns 6
+
+Strings are built per session (as they are when records come from JSON or LLM output),
+so interning is measured rather than getting literal sharing for free.
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from app.services.session_record import INTELLIGENCE_FIELDS, SessionRecord
+
+PERSONAS = ["elderly", "student", "busy_mom", "skeptic"]
+BANKS = ["State Bank of India", "HDFC Bank", "ICICI Bank", "Axis Bank", "Punjab National Bank"]
+NAMES = ["Rahul Sharma", "Priya Singh", "Vijay Kumar", "Amit Verma", "Neha Gupta"]
+
+
+def turn_intelligence(rng: random.Random, session: int, turn: int) -> Dict[str, List[str]]:
+    """One extractor result: all nine keys, a few values, mostly repeats of earlier turns."""
+    data = {field: [] for field in INTELLIGENCE_FIELDS}
+    if turn % 2 == 0:
+        data["upi_ids"].append(f"pay.{session % 5000}.{turn // 2}@ybl")
+    if turn % 3 == 0:
+        data["phone_numbers"].append(f"98{session:08d}"[-10:])
+    data["bank_names"].append("".join(rng.choice(BANKS))) # Fresh str object, like parsed JSON
+    data["person_names"].append("".join(rng.choice(NAMES)))
+    if turn == 1:
+        data["urls"].append(f"https://kyc-{session % 300}.example.in/verify")
+    return data
+
+
+def legacy_record(persona: str, now: float) -> Dict[str, Any]:
+    return {
+        "message_count": 0, "persona": persona, "start_time": now, "last_active": now,
+        "intelligence": {field: [] for field in INTELLIGENCE_FIELDS}
+    }
+
+
+def legacy_merge(session: Dict[str, Any], intelligence_data: Dict[str, list], now: float):
+    # The pre-SessionRecord MemorySessionStore.apply_update
+    session["message_count"] += 1
+    session["last_active"] = now
+    for key in intelligence_data:
+        if key not in session["intelligence"]:
+            session["intelligence"][key] = []
+        current = set(session["intelligence"][key])
+        new_items = set(intelligence_data[key])
+        session["intelligence"][key] = list(current.union(new_items))
+
+
+def compact_record(persona: str, now: float) -> SessionRecord:
+    return SessionRecord(0, persona, now, now)
+
+
+def compact_merge(session: SessionRecord, intelligence_data: Dict[str, list], now: float):
+    session.message_count += 1
+    session.last_active = now
+    session.merge_intelligence(intelligence_data)
+
+
+def build(n: int, turns: int, make: Callable, merge: Callable, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    sessions = {}
+    for i in range(n):
+        record = make("".join(rng.choice(PERSONAS)), 0.0)
+        for turn in range(turns):
+            merge(record, turn_intelligence(rng, i, turn), 0.0)
+        sessions[f"session-{i}"] = record
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"sessions": sessions, "bytes": current}
+
+
+def time_merges(sessions: Dict[str, Any], merge: Callable, seed: int) -> float:
+    """Seconds per merge for one more turn on every session, in random order."""
+    rng = random.Random(seed)
+    ids = list(sessions)
+    rng.shuffle(ids)
+    batch = [(sessions[sid], turn_intelligence(rng, i, 7)) for i, sid in enumerate(ids)]
+    start = time.perf_counter()
+    for record, data in batch:
+        merge(record, data, 1.0)
+    return (time.perf_counter() - start) / len(batch)
+
+
+def time_serialize(sessions: Dict[str, Any], to_json: Callable) -> float:
+    sample = list(sessions.values())[:10000]
+    start = time.perf_counter()
+    for record in sample:
+        json.dumps(to_json(record))
+    return (time.perf_counter() - start) / len(sample)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session record memory / merge benchmark")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=6, help="Turns merged into each session before measuring")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    variants = {
+        "dict+lists": (legacy_record, legacy_merge, lambda record: record),
+        "SessionRecord": (compact_record, compact_merge, lambda record: record.to_dict()),
+    }
+    print(f"{'record':<15}{'bytes/session':>15}{'merge us':>10}{'serialize us':>14}")
+    for name, (make, merge, to_json) in variants.items():
+        built = build(args.sessions, args.turns, make, merge, args.seed)
+        merge_s = time_merges(built["sessions"], merge, args.seed)
+        serialize_s = time_serialize(built["sessions"], to_json)
+        print(f"{name:<15}{built['bytes'] / args.sessions:>15.0f}{merge_s * 1e6:>10.2f}{serialize_s * 1e6:>14.2f}")
+        del built
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from app.services.chat_agent import ActionStripper, strip_actions
+
+
+def stream(text: str, chunk_sizes) -> str:
+    stripper = ActionStripper()
+    out, i = [], 0
+    for size in chunk_sizes:
+        out.append(stripper.feed(text[i:i + size]))
+        i += size
+    out.append(stripper.feed(text[i:]))
+    out.append(stripper.finish())
+    return "".join(out)
+
+
+@pytest.mark.parametrize("text", [
+    "Oh (wait * sighs) dear *x",
+    "Hi *waves\nhello* there",
+    "*smiles* Hello dear, [pause] who is this (confused)?",
+    "Oh [a (b] c) d",
+    "(a *b) c* d",
+    "  *sighs*  Okay  ",
+    "Unclosed (bracket here",
+    "[x\n] y (z\n) *w\n*",
+])
+def test_streamed_output_matches_regex_cleanup(text):
+    expected = strip_actions(text)
+    assert stream(text, [len(text)]) == expected
+    assert stream(text, [1] * len(text)) == expected
+
+
+def test_random_chunking_matches_regex_cleanup():
+    rng = random.Random(11)
+    for _ in range(2000):
+        text = "".join(rng.choice("ab *[]()\n") for _ in range(rng.randint(0, 30)))
+        sizes = [rng.randint(1, 5) for _ in range(len(text))]
+        assert stream(text, sizes) == strip_actions(text), repr(text)
@@ -0,0 +1,15 @@
+from app.services.callback_outbox import CallbackOutbox
+
+
+def test_writes_apply_in_order(tmp_path):
+    """Writes go through the writer thread; an older version or an ack never loses the newest report."""
+    outbox = CallbackOutbox(str(tmp_path / "callbacks.db"))
+    outbox.put("a", 1, {"v": 1})
+    outbox.put("a", 3, {"v": 3})
+    outbox.put("a", 2, {"v": 2}) # Late-finishing older turn
+    outbox.put("b", 1, {"v": 1})
+    outbox.ack([("a", 2), ("b", 1)])
+    assert outbox.flush()
+
+    assert [(sid, version, payload) for sid, version, payload, _ in outbox.fetch_batch(10)] == [("a", 3, {"v": 3})]
+    outbox.close()
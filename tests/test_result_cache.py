@@ -0,0 +1,52 @@
+import asyncio
+
+from app.services.result_cache import ResultCache
+
+
+def test_follower_survives_leader_cancellation():
+    """A stage timeout on the caller that started the call must not cancel it for the others."""
+    async def scenario():
+        cache = ResultCache("test", max_entries=10)
+        calls = 0
+
+        async def classify():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"score": 0.9}
+
+        key = ResultCache.make_key("Your KYC is expiring", "scam")
+        leader = asyncio.create_task(cache.get_or_compute(key, classify))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute(key, classify))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        assert await follower == {"score": 0.9}
+        assert leader.cancelled()
+        assert calls == 1
+        assert cache.get(key) == {"score": 0.9}
+        # Once settled, a repeat is a plain hit
+        assert await cache.get_or_compute(key, classify) == {"score": 0.9}
+        assert calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        cache = ResultCache("test", max_entries=10)
+
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        key = ResultCache.make_key("hello", "scam")
+        results = await asyncio.gather(
+            cache.get_or_compute(key, broken), cache.get_or_compute(key, broken), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache.get(key) is None
+        assert cache.stats["coalesced"] == 1
+
+    asyncio.run(scenario())